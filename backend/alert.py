@@ -1,12 +1,25 @@
+import io
 import os
+import math
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 import requests
 from PIL import Image
 from dotenv import load_dotenv
-from sentinelhub import SHConfig, SentinelHubRequest, MimeType, CRS, BBox, DataCollection
-from web3 import Web3
+
+from raster_cache import RasterCache, raster_key
+
+# Heavy integrations are optional too: the fake data source runs without them
+try:
+    from sentinelhub import SHConfig, SentinelHubRequest, MimeType, CRS, BBox, DataCollection
+except ImportError:
+    SHConfig = None
+try:
+    from web3 import Web3
+except ImportError:
+    Web3 = None
 
 # ==============================
 # CONFIGURATION
@@ -23,15 +36,25 @@ load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 SENTINEL_CLIENT_ID = os.getenv("SENTINEL_CLIENT_ID")
 SENTINEL_CLIENT_SECRET = os.getenv("SENTINEL_CLIENT_SECRET")
 
-config = SHConfig()
-if SENTINEL_CLIENT_ID and SENTINEL_CLIENT_SECRET:
+config = SHConfig() if SHConfig else None
+if config and SENTINEL_CLIENT_ID and SENTINEL_CLIENT_SECRET:
     config.sh_client_id = SENTINEL_CLIENT_ID
     config.sh_client_secret = SENTINEL_CLIENT_SECRET
-else:
+elif config:
     # Without credentials, Sentinel requests will be skipped
     config.sh_client_id = None
     config.sh_client_secret = None
 
+# Band source: "sentinel" (default) or "fake" (synthetic rasters, no network)
+NDVI_SOURCE = os.getenv("NDVI_SOURCE", "sentinel")
+
+# On-disk cache of downloaded rasters (past imagery never changes)
+raster_cache = RasterCache(
+    os.getenv("NDVI_CACHE_DIR") or os.path.join(os.path.dirname(__file__), ".raster_cache"),
+    max_bytes=int(float(os.getenv("NDVI_CACHE_MAX_MB", 2048)) * 1024 * 1024),
+    enabled=os.getenv("NDVI_CACHE_ENABLED", "1") != "0"
+)
+
 # Pinata credentials (optional)
 PINATA_API_KEY = os.getenv("PINATA_API_KEY")
 PINATA_SECRET_API_KEY = os.getenv("PINATA_SECRET_API_KEY")
@@ -60,7 +83,7 @@ CONTRACT_ABI = json.loads("""[
 # Connect Web3 only if URL is provided
 w3 = None
 contract = None
-if INFURA_URL:
+if INFURA_URL and Web3:
     try:
         w3 = Web3(Web3.HTTPProvider(INFURA_URL))
         if w3.is_connected() and CONTRACT_ADDRESS:
@@ -74,43 +97,101 @@ if INFURA_URL:
 # ==============================
 # SENTINEL HUB FETCH
 # ==============================
-def fetch_ndvi_bands(bbox_coords, date):
-    if not (SENTINEL_CLIENT_ID and SENTINEL_CLIENT_SECRET):
-        print("Sentinel credentials missing. Skipping SentinelHub request.")
+NDVI_EVALSCRIPT = """
+    // NDVI bands: B04=Red, B08=NIR
+    return [B04, B08];
+    """
+MAX_CLOUD_COVERAGE = 40
+
+def fetch_ndvi_bands(bbox_coords, date, size=(512, 512)):
+    # Cache first: re-analyses of past dates need neither the network nor credentials
+    key = raster_key(bbox_coords, date, size, NDVI_EVALSCRIPT, MAX_CLOUD_COVERAGE, "sentinel-2-l2a")
+    cached = raster_cache.get(key)
+    if cached is not None:
+        return cached
+
+    if not (SENTINEL_CLIENT_ID and SENTINEL_CLIENT_SECRET and SHConfig):
+        print("Sentinel credentials or sentinelhub package missing. Skipping SentinelHub request.")
         return None
 
     print(f"Fetching data for {date} ...")
     bbox = BBox(bbox=bbox_coords, crs=CRS.WGS84)
 
-    evalscript = """
-    // NDVI bands: B04=Red, B08=NIR
-    return [B04, B08];
-    """
-
     try:
         request = SentinelHubRequest(
-            evalscript=evalscript,
+            evalscript=NDVI_EVALSCRIPT,
             input_data=[SentinelHubRequest.input_data(
                 data_collection=DataCollection.SENTINEL2_L2A,
                 time_interval=(f"{date}T00:00:00", f"{date}T23:59:59"),
-                other_args={"dataFilter": {"maxCloudCoverage": 40}}
+                other_args={"dataFilter": {"maxCloudCoverage": MAX_CLOUD_COVERAGE}}
             )],
             responses=[SentinelHubRequest.output_response("default", MimeType.TIFF)],
             bbox=bbox,
-            size=(512, 512),
+            size=size,
             config=config
         )
         data = request.get_data()
     except Exception as e:
+        # Raised, not None: a network error is worth retrying, a date without imagery is not
         print("SentinelHub request error:", e)
-        return None
+        raise
 
     if not data or len(data) == 0:
         print("No data returned for this date.")
         return None
 
-    print(f"Data received for {date}, shape: {np.array(data[0]).shape}")
-    return np.array(data[0])
+    image = np.array(data[0])
+    print(f"Data received for {date}, shape: {image.shape}")
+    # Today's imagery can still gain acquisitions; only past dates are final
+    if date < time.strftime("%Y-%m-%d", time.gmtime()):
+        raster_cache.put(key, image)
+    return image
+
+# ==============================
+# FAKE DATA SOURCE (offline runs / tests)
+# ==============================
+# Clearings in the synthetic forest appear in imagery from this date on
+FAKE_CLEARING_DATE = "2025-09-08"
+FAKE_CELL_DEGREES = 0.02
+
+def fake_ndvi_bands(bbox_coords, date, size=(512, 512)):
+    """Deterministic synthetic B04/B08 raster, same (height, width, 2) layout as Sentinel.
+
+    Values depend only on geographic coordinates, so adjacent tiles join up
+    seamlessly; one in seven 0.02 degree cells gets a clearing from FAKE_CLEARING_DATE.
+    """
+    width, height = size
+    min_lon, min_lat, max_lon, max_lat = bbox_coords
+    lon = min_lon + (np.arange(width) + 0.5) * (max_lon - min_lon) / width
+    lat = max_lat - (np.arange(height) + 0.5) * (max_lat - min_lat) / height  # row 0 = north
+    lon, lat = np.meshgrid(lon, lat)
+
+    # Healthy canopy: NDVI around 0.75 with some texture
+    nir = 0.45 + 0.05 * np.sin(lon * 400) * np.cos(lat * 400)
+    red = 0.06 + 0.01 * np.cos(lon * 300)
+
+    if date >= FAKE_CLEARING_DATE:
+        cell_x = np.floor(lon / FAKE_CELL_DEGREES).astype(np.int64)
+        cell_y = np.floor(lat / FAKE_CELL_DEGREES).astype(np.int64)
+        chosen = ((cell_x * 73856093) ^ (cell_y * 19349663)) % 7 == 0
+        dx = lon - (cell_x + 0.5) * FAKE_CELL_DEGREES
+        dy = lat - (cell_y + 0.5) * FAKE_CELL_DEGREES
+        cleared = chosen & (dx * dx + dy * dy < (0.3 * FAKE_CELL_DEGREES) ** 2)
+        nir = np.where(cleared, 0.2, nir)
+        red = np.where(cleared, 0.15, red)
+
+    return np.stack([red, nir], axis=-1).astype(np.float32)
+
+DATA_SOURCES = {
+    "sentinel": fetch_ndvi_bands,
+    "fake": fake_ndvi_bands,
+}
+
+def get_data_source(name=None):
+    name = name or NDVI_SOURCE
+    if name not in DATA_SOURCES:
+        raise ValueError(f"Unknown NDVI source '{name}'. Must be one of: {', '.join(DATA_SOURCES)}")
+    return DATA_SOURCES[name]
 
 # ==============================
 # NDVI(Normalized Difference Vegetation Index) COMPUTATION
@@ -124,14 +205,147 @@ def compute_ndvi(image):
 # ==============================
 # CHANGE DETECTION
 # ==============================
-def detect_change(ndvi_before, ndvi_after, threshold=0.2):
-    print("Detecting change...")
+def detect_change(ndvi_before, ndvi_after, threshold=0.2, verbose=True):
+    if verbose:
+        print("Detecting change...")
     delta = np.abs(ndvi_after - ndvi_before)
     change_mask = delta > threshold
     percent_changed = (np.sum(change_mask) / change_mask.size) * 100
-    print(f"Change detected: {percent_changed:.2f}% of area")
+    if verbose:
+        print(f"Change detected: {percent_changed:.2f}% of area")
     return change_mask, percent_changed
 
+# ==============================
+# TILED PROCESSING OF LARGE AREAS
+# ==============================
+METERS_PER_DEGREE = 111320
+TILE_PX = 512       # Sentinel Hub allows up to 2500 px per side; 512 keeps requests small
+MAX_TILES = 4096
+# Above this share of tiles failing with errors the whole analysis fails (and is retried)
+MAX_FAILED_TILE_FRACTION = 0.1
+
+def tile_grid(bbox, resolution_m=None, tile_px=TILE_PX, max_tiles=MAX_TILES):
+    """Split bbox into tiles of at most tile_px x tile_px pixels at resolution_m metres/pixel.
+
+    Without resolution_m the whole bbox is a single tile_px raster (the old behaviour).
+    Returns (tiles, (height_px, width_px)); each tile has its bbox, size and pixel offset.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if min_lon >= max_lon or min_lat >= max_lat:
+        raise ValueError("Invalid bbox: expected [min_lon, min_lat, max_lon, max_lat]")
+
+    if resolution_m is None:
+        width_px = height_px = tile_px
+    else:
+        if resolution_m <= 0:
+            raise ValueError("resolution_m must be positive")
+        mid_lat = math.radians((min_lat + max_lat) / 2)
+        width_px = max(1, math.ceil((max_lon - min_lon) * METERS_PER_DEGREE * math.cos(mid_lat) / resolution_m))
+        height_px = max(1, math.ceil((max_lat - min_lat) * METERS_PER_DEGREE / resolution_m))
+
+    cols = math.ceil(width_px / tile_px)
+    rows = math.ceil(height_px / tile_px)
+    if rows * cols > max_tiles:
+        raise ValueError(f"Area needs {rows * cols} tiles (max {max_tiles}); use a coarser resolution_m")
+
+    # Even split, so the last row/column is not a thin sliver
+    col_edges = [round(i * width_px / cols) for i in range(cols + 1)]
+    row_edges = [round(i * height_px / rows) for i in range(rows + 1)]
+    lon_per_px = (max_lon - min_lon) / width_px
+    lat_per_px = (max_lat - min_lat) / height_px
+
+    tiles = []
+    for r in range(rows):
+        y0, y1 = row_edges[r], row_edges[r + 1]
+        for c in range(cols):
+            x0, x1 = col_edges[c], col_edges[c + 1]
+            tiles.append({
+                "row": r, "col": c, "x": x0, "y": y0,
+                "size": (x1 - x0, y1 - y0),
+                # Pixel row 0 is the northern edge
+                "bbox": [min_lon + x0 * lon_per_px, max_lat - y1 * lat_per_px,
+                         min_lon + x1 * lon_per_px, max_lat - y0 * lat_per_px],
+            })
+    return tiles, (height_px, width_px)
+
+def process_tile(tile, date_before, date_after, threshold, fetch, retries=1):
+    """Fetch both dates for one tile and return its change mask (None if data is missing).
+
+    Errors (network, bad responses) are retried `retries` times before being raised.
+    """
+    for attempt in range(retries + 1):
+        try:
+            before = fetch(tile["bbox"], date_before, size=tile["size"])
+            after = fetch(tile["bbox"], date_after, size=tile["size"])
+            break
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+    if before is None or after is None:
+        return None
+    change_mask, _ = detect_change(compute_ndvi(before), compute_ndvi(after), threshold, verbose=False)
+    return change_mask
+
+def analyze_area(bbox, date_before, date_after, threshold=0.2, resolution_m=None, max_workers=4, source=None,
+                 tile_retries=1, max_failed_fraction=MAX_FAILED_TILE_FRACTION):
+    """Tile the bbox, process tiles on a bounded thread pool and mosaic the change masks.
+
+    Threads rather than processes: tiles spend most of their time waiting on the
+    network and the numpy work releases the GIL. Tiles without imagery are left
+    out of the percentage. If more than max_failed_fraction of the tiles still
+    fail with errors after their retries, the analysis raises (run_stage retries
+    it; tiles already downloaded come from the raster cache). Otherwise the
+    result is marked partial and lists the failed tiles. Returns None if no tile
+    had data.
+    """
+    fetch = get_data_source(source)
+    tiles, shape = tile_grid(bbox, resolution_m)
+    print(f"Processing {len(tiles)} tile(s), mosaic {shape[1]}x{shape[0]} px, {max_workers} worker(s)")
+
+    mosaic = np.zeros(shape, dtype=bool)
+    changed = 0
+    valid = 0
+    missing = 0
+    tile_errors = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tiles)))) as pool:
+        futures = {pool.submit(process_tile, tile, date_before, date_after, threshold, fetch, tile_retries): tile
+                   for tile in tiles}
+        for future in as_completed(futures):
+            tile = futures[future]
+            try:
+                mask = future.result()
+            except Exception as e:
+                print(f"Tile {tile['row']},{tile['col']} failed:", e)
+                tile_errors.append({"row": tile["row"], "col": tile["col"], "error": f"{type(e).__name__}: {e}"})
+                continue
+            if mask is None:
+                missing += 1
+                continue
+            h, w = mask.shape
+            mosaic[tile["y"]:tile["y"] + h, tile["x"]:tile["x"] + w] = mask
+            changed += int(mask.sum())
+            valid += mask.size
+
+    if len(tile_errors) > max_failed_fraction * len(tiles):
+        raise RuntimeError(f"{len(tile_errors)} of {len(tiles)} tile(s) failed, first: {tile_errors[0]['error']}")
+    if valid == 0:
+        return None
+    percent_changed = changed / valid * 100
+    failed = missing + len(tile_errors)
+    print(f"Change detected: {percent_changed:.2f}% of area "
+          f"({missing} tile(s) without data, {len(tile_errors)} failed, of {len(tiles)})")
+    return {
+        "mask": mosaic,
+        "percent_changed": percent_changed,
+        "tiles": len(tiles),
+        "tiles_failed": failed,
+        "tiles_missing": missing,
+        "tile_errors": sorted(tile_errors, key=lambda t: (t["row"], t["col"]))[:50],
+        "partial": failed > 0,
+        "shape": shape,
+    }
+
 # ==============================
 # UPLOAD TO PINATA
 # ==============================
@@ -141,15 +355,17 @@ def upload_to_pinata(change_mask, metadata):
         return None
 
     print("Uploading evidence to Pinata...")
-    img = Image.fromarray((change_mask * 255).astype('uint8'))
-    img.save("change_mask.png")
+    # uint8 before scaling: a bool * 255 would go through an int64 copy of the whole mosaic
+    img = Image.fromarray(change_mask.astype(np.uint8) * 255)
+    # In memory, not a shared change_mask.png: several jobs may upload at once
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
 
     headers = {"pinata_api_key": PINATA_API_KEY, "pinata_secret_api_key": PINATA_SECRET_API_KEY}
 
     # Upload image
-    with open("change_mask.png", "rb") as fp:
-        files = {"file": fp}
-        response = requests.post("https://api.pinata.cloud/pinning/pinFileToIPFS", files=files, headers=headers)
+    files = {"file": ("change_mask.png", buffer.getvalue(), "image/png")}
+    response = requests.post("https://api.pinata.cloud/pinning/pinFileToIPFS", files=files, headers=headers)
 
     if response.status_code != 200:
         print("Pinata image upload error:", response.text)
@@ -209,18 +425,50 @@ def log_deforestation_event(ipfs_hash, lat, lon, ndvi_change_percent):
 # ==============================
 # MAIN PIPELINE
 # ==============================
-def main_pipeline(bbox, date_before, date_after, threshold=0.2):
+def run_stage(name, fn, *args, retries=0, backoff=2.0, on_stage=None):
+    """Run one pipeline stage, retrying (with exponential backoff) when it raises or returns None.
+
+    A ValueError means the request itself is invalid (e.g. too many tiles) and is
+    raised at once; if the last attempt raised, that exception is re-raised so
+    the caller keeps the real reason.
+    """
+    error = None
+    for attempt in range(retries + 1):
+        if on_stage:
+            on_stage(name, attempt)
+        try:
+            result = fn(*args)
+            error = None
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"Stage {name} failed (attempt {attempt + 1}/{retries + 1}):", e)
+            result = None
+            error = e
+        if result is not None:
+            return result
+        if attempt < retries:
+            time.sleep(backoff * 2 ** attempt)
+    if error is not None:
+        raise error
+    return None
+
+def main_pipeline(bbox, date_before, date_after, threshold=0.2, resolution_m=None, max_workers=4, source=None,
+                  retries=0, on_stage=None):
+    """Analyze -> upload evidence -> log on-chain. Each stage is retried up to `retries`
+    times; on_stage(name, attempt) is called before every attempt (job progress)."""
     print("=== Starting Pipeline ===")
-    before = fetch_ndvi_bands(bbox, date_before)
-    after = fetch_ndvi_bands(bbox, date_after)
-    if before is None or after is None:
+    try:
+        area = run_stage("analyze", analyze_area, bbox, date_before, date_after, threshold, resolution_m,
+                         max_workers, source, retries=retries, on_stage=on_stage)
+    except Exception as e:
+        print("ERROR: Analysis failed:", e)
+        return {"error": f"{type(e).__name__}: {e}"}
+    if area is None:
         print("ERROR: Could not fetch Sentinel data for both dates.")
         return {"error": "sentinel_missing_or_failed"}
 
-    ndvi_before = compute_ndvi(before)
-    ndvi_after = compute_ndvi(after)
-
-    change_mask, percent_changed = detect_change(ndvi_before, ndvi_after, threshold)
+    change_mask, percent_changed = area["mask"], area["percent_changed"]
 
     metadata = {
         "bbox": bbox,
@@ -229,19 +477,41 @@ def main_pipeline(bbox, date_before, date_after, threshold=0.2):
         "percent_changed": percent_changed
     }
 
-    ipfs_hash = upload_to_pinata(change_mask, metadata)
+    # Missing keys are a skip, not a failure: only retry stages that are configured
+    ipfs_hash = None
+    if PINATA_API_KEY and PINATA_SECRET_API_KEY:
+        try:
+            ipfs_hash = run_stage("upload", upload_to_pinata, change_mask, metadata, retries=retries, on_stage=on_stage)
+        except Exception as e:
+            print("Pinata upload failed:", e)
+    else:
+        print("Pinata keys missing. Skipping IPFS upload.")
 
+    receipt = None
     if ipfs_hash:
         print("Logging event on blockchain...")
         lat_center = (bbox[1] + bbox[3]) / 2
         lon_center = (bbox[0] + bbox[2]) / 2
-        receipt = log_deforestation_event(ipfs_hash, lat_center, lon_center, percent_changed)
+        if w3 and contract and PRIVATE_KEY and ACCOUNT_ADDRESS:
+            # Not retried: a failure after send_raw_transaction would log the event twice
+            try:
+                receipt = run_stage("log", log_deforestation_event, ipfs_hash, lat_center, lon_center,
+                                    percent_changed, on_stage=on_stage)
+            except Exception as e:
+                print("On-chain logging failed:", e)
+        else:
+            print("Blockchain keys or connection missing. Skipping on-chain logging.")
         if receipt:
             print("Blockchain receipt:", receipt)
 
     return {
-        "percent_changed": percent_changed,
-        "ipfs_hash": ipfs_hash
+        "percent_changed": float(percent_changed),
+        "ipfs_hash": ipfs_hash,
+        "tx_hash": receipt.transactionHash.hex() if receipt else None,
+        "tiles": area["tiles"],
+        "tiles_failed": area["tiles_failed"],
+        "tile_errors": area["tile_errors"],
+        "partial": area["partial"]
     }
 
 # ==============================
@@ -249,6 +519,8 @@ def main_pipeline(bbox, date_before, date_after, threshold=0.2):
 # ==============================
 if __name__ == "__main__":
     bbox = [25.0, 45.0, 25.05, 45.05]  # Replace with your AOI
-    result = main_pipeline(bbox, "2025-09-01", "2025-09-15", threshold=0.3)
+    # resolution_m=10 is Sentinel-2's native B04/B08 resolution; larger AOIs are tiled
+    result = main_pipeline(bbox, "2025-09-01", "2025-09-15", threshold=0.3, resolution_m=10)
     print("\n=== FINAL RESULT ===")
-    print(result)
\ No newline at end of file
+    print(result)
+    print("Raster cache:", raster_cache.stats())
\ No newline at end of file
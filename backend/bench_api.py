@@ -0,0 +1,262 @@
+# backend/bench_api.py
+# In-process API benchmark: builds the app with create_app() on a throwaway
+# SQLite database, seeds users/alerts and measures latency per scenario.
+#
+#   python bench_api.py --alerts 20000 --requests 500 --output bench.json
+#   python bench_api.py --compare bench.json      # exit code 1 on p95 regressions
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+SCENARIOS = ['login', 'create_alert', 'list_alerts', 'list_alerts_filtered', 'admin_users', 'admin_alerts']
+
+ALERT_TYPES = ['deforestation', 'fire', 'pollution', 'wildlife', 'other']
+PASSWORD = 'bench-password'
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def random_alert(rng):
+    return {
+        'title': f'Bench alert {rng.randint(0, 10 ** 6)}',
+        'description': 'Synthetic alert created by the API benchmark',
+        'type': rng.choice(ALERT_TYPES),
+        'latitude': rng.uniform(43.5, 48.3),
+        'longitude': rng.uniform(20.2, 29.7),
+    }
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.tmpdir = tempfile.TemporaryDirectory(prefix='bench-api-')
+        config = {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(self.tmpdir.name, 'bench.db'),
+            'BCRYPT_LOG_ROUNDS': args.bcrypt_rounds,
+            'BCRYPT_MAX_PENDING': max(32, args.concurrency * 2),
+            # Each create_alert call should insert a row, not merge into a neighbour
+            'DEDUP_ENABLED': False,
+            'RESPONSE_CACHE_ENABLED': not args.no_cache,
+            'METRICS_ENABLED': False,
+        }
+        from run import create_app
+        # create_app() prints progress; keep stdout for the JSON result
+        with contextlib.redirect_stdout(sys.stderr):
+            self.app = create_app(config)
+        if self.app is None:
+            raise SystemExit('create_app() failed')
+        self.client = self.app.test_client()
+
+    def close(self):
+        from models import db
+        with self.app.app_context():
+            db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def seed(self):
+        from models import db, User
+        started = time.perf_counter()
+        with self.app.app_context():
+            db.session.add(User(name='Bench Admin', email='admin@bench.local', password=PASSWORD, role='admin'))
+            for i in range(self.args.users):
+                db.session.add(User(name=f'Bench User {i}', email=f'user{i}@bench.local', password=PASSWORD))
+            db.session.commit()
+
+        self.admin = self._login('admin@bench.local')
+        self.users = [self._login(f'user{i}@bench.local') for i in range(min(self.args.users, 10))] or [self.admin]
+        remaining = self.args.alerts
+        while remaining > 0:
+            chunk = min(remaining, 5000)
+            response = self.client.post('/api/alerts/batch', headers=self.rng.choice(self.users),
+                                        json=[random_alert(self.rng) for _ in range(chunk)])
+            if response.status_code != 201:
+                raise SystemExit(f'Seeding alerts failed: {response.get_json()}')
+            remaining -= chunk
+        return time.perf_counter() - started
+
+    def _login(self, email):
+        response = self.client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+        return {'Authorization': 'Bearer ' + response.get_json()['access_token']}
+
+    # Each scenario returns (method, url, kwargs, expected status) for one request
+    def login(self, rng):
+        email = f'user{rng.randrange(self.args.users)}@bench.local' if self.args.users else 'admin@bench.local'
+        return 'post', '/api/auth/login', {'json': {'email': email, 'password': PASSWORD}}, 200
+
+    def create_alert(self, rng):
+        return 'post', '/api/alerts', {'json': random_alert(rng), 'headers': rng.choice(self.users)}, 201
+
+    def list_alerts(self, rng):
+        return 'get', '/api/alerts', {'query_string': {'limit': 50}}, 200
+
+    def list_alerts_filtered(self, rng):
+        choice = rng.randrange(4)
+        if choice == 0:
+            params = {'status': 'pending'}
+        elif choice == 1:
+            params = {'type': rng.choice(ALERT_TYPES)}
+        elif choice == 2:
+            lat, lng = rng.uniform(44, 47.5), rng.uniform(21, 28.5)
+            params = {'bbox': f'{lng:.3f},{lat:.3f},{lng + 0.8:.3f},{lat + 0.5:.3f}'}
+        else:
+            params = {'lat': round(rng.uniform(44, 47.5), 3), 'lng': round(rng.uniform(21, 28.5), 3), 'radius_km': 25}
+        return 'get', '/api/alerts', {'query_string': {**params, 'limit': 50}}, 200
+
+    def admin_users(self, rng):
+        return 'get', '/api/admin/users', {'headers': self.admin, 'query_string': {'limit': 100}}, 200
+
+    def admin_alerts(self, rng):
+        return 'get', '/api/admin/alerts', {'headers': self.admin, 'query_string': {'limit': 100}}, 200
+
+    def run_scenario(self, name):
+        build = getattr(self, name)
+        total = self.args.requests
+        workers = self.args.concurrency
+
+        def worker(index):
+            # One test client and RNG per worker thread
+            client = self.app.test_client()
+            rng = random.Random(self.args.seed * 1000 + index)
+            timings, errors = [], 0
+            for _ in range(total // workers + (1 if index < total % workers else 0)):
+                method, url, kwargs, expected = build(rng)
+                start = time.perf_counter()
+                response = getattr(client, method)(url, **kwargs)
+                timings.append(time.perf_counter() - start)
+                if response.status_code != expected:
+                    errors += 1
+            return timings, errors
+
+        for _ in range(self.args.warmup):
+            method, url, kwargs, _ = build(self.rng)
+            getattr(self.client, method)(url, **kwargs)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(worker, range(workers)))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(t for result in results for t in result[0])
+        errors = sum(result[1] for result in results)
+
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            'requests': len(timings),
+            'errors': errors,
+            'seconds': round(elapsed, 4),
+            'throughput_rps': round(len(timings) / elapsed, 2) if elapsed else None,
+            'mean_ms': ms(sum(timings) / len(timings)) if timings else None,
+            'p50_ms': ms(percentile(timings, 50)),
+            'p95_ms': ms(percentile(timings, 95)),
+            'p99_ms': ms(percentile(timings, 99)),
+            'max_ms': ms(timings[-1]) if timings else None,
+        }
+
+
+def compare(results, baseline, tolerance):
+    """Scenarios whose p95 grew more than `tolerance` (fraction) over the baseline."""
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or not previous.get('p95_ms') or current.get('p95_ms') is None:
+            continue
+        ratio = current['p95_ms'] / previous['p95_ms']
+        if ratio > 1 + tolerance:
+            regressions.append({'scenario': name, 'baseline_p95_ms': previous['p95_ms'],
+                                'p95_ms': current['p95_ms'], 'ratio': round(ratio, 3)})
+        if current['errors'] > previous.get('errors', 0):
+            regressions.append({'scenario': name, 'baseline_errors': previous.get('errors', 0),
+                                'errors': current['errors']})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='In-process benchmark of the alerts API.')
+    parser.add_argument('--users', type=int, default=20, help='users to seed (default 20)')
+    parser.add_argument('--alerts', type=int, default=5000, help='alerts to seed (default 5000)')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per scenario (default 200)')
+    parser.add_argument('--concurrency', type=int, default=1, help='worker threads per scenario (default 1)')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests before each scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f'comma-separated subset of: {", ".join(SCENARIOS)}')
+    parser.add_argument('--bcrypt-rounds', type=int, default=12,
+                        help='BCRYPT_LOG_ROUNDS for the run (login cost is dominated by it)')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for reproducible runs')
+    parser.add_argument('--output', help='write the JSON result here (default: stdout)')
+    parser.add_argument('--compare', help='baseline JSON from a previous run')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed p95 growth over the baseline (default 0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    args.scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenario(s): {", ".join(sorted(unknown))}')
+    if args.concurrency < 1 or args.requests < 1:
+        parser.error('--concurrency and --requests must be positive')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    bench = Bench(args)
+    try:
+        seed_seconds = bench.seed()
+        results = {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'environment': {
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+            },
+            'parameters': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+            'seed_seconds': round(seed_seconds, 3),
+            'scenarios': {},
+        }
+        for name in args.scenarios:
+            results['scenarios'][name] = summary = bench.run_scenario(name)
+            print(f"{name:22} {summary['throughput_rps']:>9} req/s  p50 {summary['p50_ms']:>8} ms  "
+                  f"p95 {summary['p95_ms']:>8} ms  p99 {summary['p99_ms']:>8} ms  errors {summary['errors']}",
+                  file=sys.stderr)
+    finally:
+        bench.close()
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            results['regressions'] = compare(results, json.load(f), args.tolerance)
+        for item in results['regressions']:
+            print(f"REGRESSION {item}", file=sys.stderr)
+        exit_code = 1 if results['regressions'] else 0
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# backend/bench_serialize.py
+# Micro-benchmark for alert list serialization on large pages: ORM objects +
+# to_dict() + Flask's JSON provider versus column tuples + serialize.dumps().
+#
+#   python bench_serialize.py --rows 10000 --repeat 7
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        samples.append(time.perf_counter() - start)
+    return {'median_ms': round(statistics.median(samples) * 1000, 3),
+            'min_ms': round(min(samples) * 1000, 3), 'bytes': size}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark alert list serialization paths.')
+    parser.add_argument('--rows', type=int, default=10000, help='alerts in the response (default 10000)')
+    parser.add_argument('--repeat', type=int, default=7, help='timed runs per path (default 7)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='bench-serialize-') as tmpdir:
+        from run import create_app
+        with contextlib.redirect_stdout(sys.stderr):
+            app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmpdir, 'bench.db'),
+                              'METRICS_ENABLED': False})
+
+        from sqlalchemy import insert
+        from models import db, Alert, User
+        import serialize
+        from serialize import alert_select, alert_dicts, dumps
+
+        with app.app_context():
+            db.session.add(User(name='Bench', email='bench@bench.local', password='bench-password'))
+            db.session.commit()
+            rng = random.Random(42)
+            base = datetime(2024, 1, 1)
+            db.session.execute(insert(Alert), [{
+                'title': f'Alert {i}', 'description': 'Synthetic alert for the serialization benchmark',
+                'type': rng.choice(['fire', 'deforestation', 'pollution']), 'status': 'pending',
+                'latitude': rng.uniform(43.5, 48.3), 'longitude': rng.uniform(20.2, 29.7), 'accuracy': 10.0,
+                'user_id': 1, 'created_at': base + timedelta(seconds=i), 'updated_at': base + timedelta(seconds=i)
+            } for i in range(args.rows)])
+            db.session.commit()
+
+            def orm_path():
+                db.session.expunge_all()
+                alerts = Alert.query.order_by(Alert.created_at.desc(), Alert.id.desc()).all()
+                return app.json.dumps({'alerts': [a.to_dict() for a in alerts]}).encode('utf-8')
+
+            def fast_path():
+                rows = db.session.execute(alert_select().order_by(Alert.created_at.desc(), Alert.id.desc())).all()
+                return dumps({'alerts': alert_dicts(rows)})
+
+            # Same documents either way (key order aside)
+            assert json.loads(orm_path()) == json.loads(fast_path())
+
+            results = {'rows': args.rows, 'repeat': args.repeat, 'paths': {}}
+            results['paths']['orm_to_dict'] = _time(orm_path, args.repeat)
+            installed = serialize.orjson
+            serialize.orjson = None
+            try:
+                results['paths']['columns_stdlib_json'] = _time(fast_path, args.repeat)
+            finally:
+                serialize.orjson = installed
+            if installed is not None:
+                results['paths']['columns_orjson'] = _time(fast_path, args.repeat)
+
+            baseline = results['paths']['orm_to_dict']['median_ms']
+            for name, result in results['paths'].items():
+                result['speedup'] = round(baseline / result['median_ms'], 2)
+            db.engine.dispose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
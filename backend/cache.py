@@ -0,0 +1,161 @@
+# backend/cache.py
+# LRU + TTL cache of pre-encoded JSON bodies for the public alert endpoints,
+# invalidated precisely from the alert write paths in routes.py.
+import threading
+import time
+from collections import OrderedDict
+
+from geo import haversine_km
+
+
+class _Entry:
+    __slots__ = ('body', 'filters', 'expires_at')
+
+    def __init__(self, body, filters, expires_at):
+        self.body = body
+        self.filters = filters
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Size-bounded LRU of response bodies.
+
+    Each entry remembers the filters that produced it ({'alert_id': ...} for a single
+    alert, status/type/bbox/circle for listings), so a write only drops the entries
+    the changed alert could appear in. The TTL bounds staleness caused by writes in
+    other worker processes, which this process cannot see.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=32 * 1024 * 1024, ttl=30, enabled=True):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # Incremented by every invalidation; fills that started earlier are discarded
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', self.max_entries)
+        self.max_bytes = app.config.get('RESPONSE_CACHE_MAX_BYTES', self.max_bytes)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.ttl)
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', self.enabled)
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.body
+
+    def set(self, key, body, filters, generation):
+        """Store body unless an invalidation happened since `generation` was read."""
+        if not self.enabled or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(body, filters, time.monotonic() + self.ttl)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_alert(self, *states):
+        """Drop entries that could contain an alert in any of the given states.
+
+        Pass the state before and after a write (dicts with id, status, type,
+        latitude, longitude); None stands for "did not exist".
+        """
+        states = [s for s in states if s]
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, entry in self._entries.items()
+                     if any(_may_contain(entry.filters, s) for s in states)]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'ttl': self.ttl
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+
+def _may_contain(filters, state):
+    if 'alert_id' in filters:
+        return filters['alert_id'] == state['id']
+    if filters.get('status') and filters['status'] != state['status']:
+        return False
+    if filters.get('type') and filters['type'] != state['type']:
+        return False
+
+    bbox = filters.get('bbox')
+    if bbox:
+        min_lng, min_lat, max_lng, max_lat = bbox
+        lat, lng = state['latitude'], state['longitude']
+        if not min_lat <= lat <= max_lat:
+            return False
+        in_lng = min_lng <= lng <= max_lng if min_lng <= max_lng else (lng >= min_lng or lng <= max_lng)
+        if not in_lng:
+            return False
+
+    circle = filters.get('circle')
+    if circle:
+        lat, lng, radius_km = circle
+        if haversine_km(lat, lng, state['latitude'], state['longitude']) > radius_km:
+            return False
+    return True
+
+
+def alert_state(alert):
+    """The fields cache invalidation needs, captured before/after a write."""
+    return {
+        'id': alert.id,
+        'status': alert.status,
+        'type': alert.type,
+        'latitude': alert.latitude,
+        'longitude': alert.longitude
+    }
+
+
+response_cache = ResponseCache()
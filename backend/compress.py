@@ -0,0 +1,94 @@
+# backend/compress.py
+# gzip / brotli compression of API responses, negotiated from Accept-Encoding.
+# brotli is optional: without the package only gzip is offered.
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is the fallback
+    brotli = None
+
+# JSON listings, CSV/NDJSON exports and text compress well; PNG tiles already are compressed
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'application/geo+json', 'text/csv', 'text/plain'}
+
+
+class Compressor:
+    """after_request hook compressing buffered responses above min_size bytes.
+
+    Streamed responses (SSE, exports) are left alone: compressing them would
+    mean buffering, which is exactly what streaming avoids.
+    """
+
+    def __init__(self, min_size=500, level=6, brotli_quality=4, enabled=True):
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.enabled = enabled
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COMPRESS_ENABLED', self.enabled)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.level = app.config.get('COMPRESS_LEVEL', self.level)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', self.brotli_quality)
+        if self.enabled:
+            app.after_request(self._compress)
+
+    @property
+    def encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def _compressible(self, response):
+        if response.direct_passthrough or response.is_streamed:
+            return False
+        if response.status_code < 200 or response.status_code in (204, 304) or 'Content-Encoding' in response.headers:
+            return False
+        if 'no-transform' in response.headers.get('Cache-Control', ''):
+            return False
+        mimetype = response.mimetype or ''
+        return mimetype in COMPRESSIBLE_TYPES or mimetype.endswith('+json')
+
+    def _compress(self, response):
+        if not self._compressible(response):
+            return response
+        # Vary even when not compressing: caches must not hand a gzip body to a client without gzip
+        response.vary.add('Accept-Encoding')
+
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=self.level, mtime=0)
+        if len(compressed) >= len(data):
+            return response
+
+        self.bytes_in += len(data)
+        self.bytes_out += len(compressed)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # Different bytes, same resource: the validator stays usable as a weak ETag
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def stats(self):
+        return {
+            'encodings': self.encodings,
+            'min_size': self.min_size,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+        }
+
+
+compressor = Compressor()
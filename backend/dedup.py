@@ -0,0 +1,41 @@
+# backend/dedup.py
+# Near-duplicate detection for new alerts: same type, still open, within a
+# radius and a time window of an existing canonical alert.
+from datetime import datetime, timedelta
+
+from models import Alert
+from geo import bbox_filter, bucket_ids, haversine_km, radius_bbox
+
+# Rapoartele noi se lipesc doar de alerte încă deschise
+OPEN_STATUSES = ('pending', 'investigating')
+
+
+def find_duplicate(fields, radius_m=250, window_minutes=30, now=None):
+    """Nearest open canonical alert of the same type near fields' coordinates, or None.
+
+    Candidates come from the handful of geo_bucket cells covering the radius
+    (index on geo_bucket, type, created_at), so the cost doesn't grow with the table.
+    """
+    lat, lng = fields['latitude'], fields['longitude']
+    bbox = radius_bbox(lat, lng, radius_m / 1000.0)
+    since = (now or datetime.utcnow()) - timedelta(minutes=window_minutes)
+
+    query = Alert.query.filter(
+        Alert.type == fields['type'],
+        Alert.status.in_(OPEN_STATUSES),
+        Alert.canonical_id.is_(None),
+        Alert.created_at >= since
+    )
+    buckets = bucket_ids(bbox)
+    if buckets is not None:
+        query = query.filter(Alert.geo_bucket.in_(buckets))
+    else:
+        # Very large radius or near a pole: too many cells, use the spatial index instead
+        query = query.filter(bbox_filter(bbox))
+
+    best, best_km = None, radius_m / 1000.0
+    for alert in query.limit(100):
+        distance = haversine_km(lat, lng, alert.latitude, alert.longitude)
+        if distance <= best_km:
+            best, best_km = alert, distance
+    return best
@@ -0,0 +1,214 @@
+# backend/density.py
+# Map aggregations over the columnar alert snapshot: grid clustering per zoom level
+# and density heatmaps.
+import base64
+import io
+import threading
+import time
+
+import numpy as np
+
+from snapshot import alert_snapshot, TYPE_LABELS, STATUS_LABELS
+
+MAX_ZOOM = 20
+# Cells per 256px map tile along each axis (64px cells)
+CELLS_PER_TILE = 4
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def grid_size(zoom):
+    return (2 ** zoom) * CELLS_PER_TILE
+
+
+def _cell_xy(lat, lng, n):
+    """Web-Mercator cell indices, so cells are square on screen at every zoom."""
+    x = np.floor((np.asarray(lng) + 180.0) / 360.0 * n).astype(np.int64)
+    phi = np.radians(np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    y = (1.0 - np.log(np.tan(phi) + 1.0 / np.cos(phi)) / np.pi) / 2.0
+    y = np.floor(y * n).astype(np.int64)
+    return np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)
+
+
+class _ZoomAggregate:
+    """Per-cell sums for one zoom level: count, lat/lng sums and type/status histograms."""
+
+    def __init__(self, keys, count, sum_lat, sum_lng, types, statuses, generation, rows):
+        self.keys = keys
+        self.count = count
+        self.sum_lat = sum_lat
+        self.sum_lng = sum_lng
+        self.types = types
+        self.statuses = statuses
+        self.generation = generation
+        self.rows = rows
+
+
+def _aggregate(view, zoom, start=0):
+    """Bin rows [start:] of the snapshot into cells with one np.unique + bincount pass."""
+    alive = view.alive[start:]
+    lat = view.lat[start:][alive]
+    lng = view.lng[start:][alive]
+    type_code = view.type_code[start:][alive].astype(np.int64)
+    status_code = view.status_code[start:][alive].astype(np.int64)
+
+    n = grid_size(zoom)
+    x, y = _cell_xy(lat, lng, n)
+    keys, inverse = np.unique(y * n + x, return_inverse=True)
+    k = len(keys)
+    n_types, n_statuses = len(TYPE_LABELS), len(STATUS_LABELS)
+    return _ZoomAggregate(
+        keys=keys,
+        count=np.bincount(inverse, minlength=k),
+        sum_lat=np.bincount(inverse, weights=lat, minlength=k),
+        sum_lng=np.bincount(inverse, weights=lng, minlength=k),
+        types=np.bincount(inverse * n_types + type_code, minlength=k * n_types).reshape(k, n_types),
+        statuses=np.bincount(inverse * n_statuses + status_code, minlength=k * n_statuses).reshape(k, n_statuses),
+        generation=view.generation,
+        rows=view.size
+    )
+
+
+def _merge(a, b):
+    keys, inverse = np.unique(np.concatenate([a.keys, b.keys]), return_inverse=True)
+    k = len(keys)
+
+    def combine(x, y):
+        out = np.zeros((k,) + x.shape[1:], dtype=np.result_type(x, y))
+        np.add.at(out, inverse, np.concatenate([x, y]))
+        return out
+
+    return _ZoomAggregate(
+        keys=keys,
+        count=combine(a.count, b.count),
+        sum_lat=combine(a.sum_lat, b.sum_lat),
+        sum_lng=combine(a.sum_lng, b.sum_lng),
+        types=combine(a.types, b.types),
+        statuses=combine(a.statuses, b.statuses),
+        generation=b.generation,
+        rows=b.rows
+    )
+
+
+class ClusterIndex:
+    """Cached per-zoom aggregates over the whole world.
+
+    New alerts are folded into the cached cells incrementally; updates and deletes
+    (a new snapshot generation) rebuild a zoom level lazily on its next request.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._lock = threading.Lock()
+        self._zooms = {}
+
+    def aggregate(self, zoom):
+        view = self.snapshot.view()
+        with self._lock:
+            agg = self._zooms.get(zoom)
+            if agg is None or agg.generation != view.generation or agg.rows > view.size:
+                agg = _aggregate(view, zoom)
+            elif agg.rows < view.size:
+                agg = _merge(agg, _aggregate(view, zoom, start=agg.rows))
+            self._zooms[zoom] = agg
+            return agg
+
+    def clusters(self, zoom, bbox=None):
+        agg = self.aggregate(zoom)
+        n = grid_size(zoom)
+        x, y = agg.keys % n, agg.keys // n
+
+        mask = np.ones(len(agg.keys), dtype=bool)
+        if bbox:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            (x0, x1), (y1, y0) = _cell_xy(np.array([min_lat, max_lat]), np.array([min_lng, max_lng]), n)
+            mask &= (y >= y0) & (y <= y1)
+            if min_lng <= max_lng:
+                mask &= (x >= x0) & (x <= x1)
+            else:
+                # bbox crosses the antimeridian
+                mask &= (x >= x0) | (x <= x1)
+
+        idx = np.flatnonzero(mask)
+        clusters = []
+        for i in idx:
+            count = int(agg.count[i])
+            clusters.append({
+                'lat': float(agg.sum_lat[i] / count),
+                'lng': float(agg.sum_lng[i] / count),
+                'count': count,
+                'types': {TYPE_LABELS[j]: int(v) for j, v in enumerate(agg.types[i]) if v},
+                'statuses': {STATUS_LABELS[j]: int(v) for j, v in enumerate(agg.statuses[i]) if v}
+            })
+        return clusters
+
+    def reset(self):
+        with self._lock:
+            self._zooms.clear()
+
+
+cluster_index = ClusterIndex(alert_snapshot)
+
+
+MAX_HEATMAP_RESOLUTION = 1024
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+
+
+def heatmap_grid(view, bbox=None, resolution=256, type_code=None, half_life_hours=None, now=None):
+    """Density grid (height x width, row 0 = northern edge) for alerts in bbox.
+
+    With half_life_hours each alert weighs 0.5 ** (age / half_life), so old
+    reports fade out of the picture.
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox or WORLD_BBOX
+    mask = view.alive.copy()
+    if type_code is not None:
+        mask &= view.type_code == type_code
+
+    lat = view.lat[mask]
+    lng = view.lng[mask]
+    if min_lng > max_lng:
+        # Antimeridian: unwrap the western part to the right of 180
+        lng = np.where(lng < min_lng, lng + 360.0, lng)
+        max_lng += 360.0
+
+    weights = None
+    if half_life_hours:
+        now = time.time() if now is None else now
+        age_hours = np.maximum(now - view.created[mask], 0.0) / 3600.0
+        weights = np.nan_to_num(0.5 ** (age_hours / half_life_hours))
+
+    grid, _, _ = np.histogram2d(
+        lat, lng,
+        bins=[resolution, resolution],
+        range=[[min_lat, max_lat], [min_lng, max_lng]],
+        weights=weights
+    )
+    return grid[::-1]
+
+
+def encode_uint16(grid):
+    """Quantize to little-endian uint16; value = q * scale (scale is 1 for counts up to 65535)."""
+    peak = float(grid.max()) if grid.size else 0.0
+    integral = np.array_equal(grid, np.round(grid))
+    if integral and peak <= 65535:
+        quantized, scale = grid, 1.0
+    else:
+        quantized, scale = np.round(grid / peak * 65535) if peak else grid, peak / 65535
+    data = quantized.astype('<u2').tobytes()
+    return {
+        'encoding': 'base64-uint16le',
+        'scale': scale,
+        'max': peak,
+        'data': base64.b64encode(data).decode('ascii')
+    }
+
+
+def encode_png(grid):
+    """8-bit grayscale PNG, brightest pixel = densest cell."""
+    from PIL import Image
+
+    peak = float(grid.max()) if grid.size else 0.0
+    pixels = np.round(grid / peak * 255) if peak else grid
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8), mode='L').save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
@@ -0,0 +1,119 @@
+# backend/events.py
+# In-process pub/sub broker behind GET /api/alerts/stream (Server-Sent Events).
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+
+class Subscription:
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.evicted = False
+
+
+class EventBroker:
+    """Fan-out of alert events with bounded per-subscriber queues.
+
+    A subscriber whose queue is full is evicted; its stream ends and the browser's
+    EventSource reconnects with Last-Event-ID, which is replayed from the ring buffer.
+    """
+
+    def __init__(self, buffer_size=1000, queue_size=100, max_subscribers=200):
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._buffer = deque(maxlen=buffer_size)
+        self._next_id = 1
+        # Event ids are "<epoch>-<n>"; ids from a previous process force a reset
+        self._epoch = format(int(time.time() * 1000), 'x')
+
+    def init_app(self, app):
+        self.buffer_size = app.config.get('SSE_BUFFER_SIZE', self.buffer_size)
+        self.queue_size = app.config.get('SSE_QUEUE_SIZE', self.queue_size)
+        self.max_subscribers = app.config.get('SSE_MAX_SUBSCRIBERS', self.max_subscribers)
+        with self._lock:
+            self._buffer = deque(self._buffer, maxlen=self.buffer_size)
+
+    def publish(self, event, data):
+        payload = json.dumps(data, separators=(',', ':'))
+        with self._lock:
+            seq = self._next_id
+            self._next_id += 1
+            event_id = f'{self._epoch}-{seq}'
+            message = format_sse(event, payload, event_id)
+            self._buffer.append((seq, message))
+            subscribers = list(self._subscribers)
+
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(message)
+            except queue.Full:
+                self._evict(sub)
+        return event_id
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber; returns None when the broker is at capacity."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            backlog = self._replay(last_event_id) if last_event_id else []
+            sub = Subscription(max(self.queue_size, len(backlog)))
+            for message in backlog:
+                sub.queue.put_nowait(message)
+            self._subscribers.add(sub)
+            return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stream(self, sub, heartbeat=15):
+        """Generator for the SSE response body; ends when the subscriber is evicted."""
+        try:
+            yield 'retry: 3000\n\n'
+            while not sub.evicted:
+                try:
+                    yield sub.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing the connection
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'buffered': len(self._buffer), 'last_id': self._next_id - 1}
+
+    def _evict(self, sub):
+        sub.evicted = True
+        self.unsubscribe(sub)
+
+    def _replay(self, last_event_id):
+        # Called with the lock held
+        epoch, _, seq = last_event_id.partition('-')
+        try:
+            seq = int(seq)
+        except ValueError:
+            seq = None
+
+        oldest = self._buffer[0][0] if self._buffer else self._next_id
+        if epoch != self._epoch or seq is None or seq < oldest - 1:
+            # Too old to replay (or from another process): the client must reload
+            return [format_sse('reset', '{}')]
+        return [message for n, message in self._buffer if n > seq]
+
+
+def format_sse(event, data, event_id=None):
+    lines = []
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {data}')
+    return '\n'.join(lines) + '\n\n'
+
+
+broker = EventBroker()
@@ -0,0 +1,87 @@
+# backend/export.py
+# Streaming alert export (NDJSON / CSV / GeoJSON) with constant memory use:
+# column-only selects read through a server-side cursor in fixed-size chunks.
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from models import db, Alert
+
+EXPORT_COLUMNS = [
+    Alert.id, Alert.title, Alert.description, Alert.type, Alert.latitude, Alert.longitude,
+    Alert.accuracy, Alert.status, Alert.user_id, Alert.report_count, Alert.canonical_id,
+    Alert.created_at, Alert.updated_at
+]
+FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'geojson': ('application/geo+json', 'geojson'),
+}
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def iter_chunks(filters=None, chunk_size=1000):
+    """Yield lists of row dicts, chunk_size rows at a time, without hydrating ORM objects."""
+    stmt = select(*EXPORT_COLUMNS).order_by(Alert.id)
+    for column, value in (filters or {}).items():
+        if value:
+            stmt = stmt.where(getattr(Alert, column) == value)
+
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        yield [
+            {**row._asdict(), 'created_at': _iso(row.created_at), 'updated_at': _iso(row.updated_at)}
+            for row in partition
+        ]
+
+
+def ndjson_stream(chunks):
+    for rows in chunks:
+        yield ''.join(json.dumps(row, separators=(',', ':')) + '\n' for row in rows)
+
+
+def csv_stream(chunks):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS, lineterminator='\n')
+    writer.writeheader()
+    # Header goes out before the first query result, so the client sees bytes immediately
+    yield buffer.getvalue()
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def geojson_stream(chunks):
+    yield '{"type":"FeatureCollection","features":['
+    first = True
+    for rows in chunks:
+        features = []
+        for row in rows:
+            properties = {k: v for k, v in row.items() if k not in ('latitude', 'longitude')}
+            features.append(json.dumps({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [row['longitude'], row['latitude']]},
+                'properties': properties
+            }, separators=(',', ':')))
+        if features:
+            yield ('' if first else ',') + ','.join(features)
+            first = False
+    yield ']}'
+
+
+def export_stream(fmt, filters=None, chunk_size=1000):
+    chunks = iter_chunks(filters, chunk_size)
+    if fmt == 'csv':
+        return csv_stream(chunks)
+    if fmt == 'geojson':
+        return geojson_stream(chunks)
+    return ndjson_stream(chunks)
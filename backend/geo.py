@@ -0,0 +1,179 @@
+# backend/geo.py
+# Spatial helpers for alert queries: bbox/radius parsing and an SQLite R*Tree
+# index over Alert.latitude/Alert.longitude kept in sync by triggers.
+import math
+import sqlite3
+
+from sqlalchemy import and_, or_, select, table, column, text
+
+from models import Alert
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Lightweight table clause (not part of db.metadata, so create_all/drop_all ignore it)
+alerts_rtree = table(
+    'alerts_rtree',
+    column('id'), column('min_lat'), column('max_lat'), column('min_lng'), column('max_lng')
+)
+
+# Set by install/detect_spatial_index(); when False we fall back to the lat/lng B-tree index
+_rtree_enabled = False
+
+_RTREE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS alerts_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    """CREATE TRIGGER IF NOT EXISTS alerts_rtree_ai AFTER INSERT ON alerts BEGIN
+        INSERT INTO alerts_rtree (id, min_lat, max_lat, min_lng, max_lng)
+        VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS alerts_rtree_au AFTER UPDATE OF latitude, longitude ON alerts BEGIN
+        UPDATE alerts_rtree
+        SET min_lat = new.latitude, max_lat = new.latitude, min_lng = new.longitude, max_lng = new.longitude
+        WHERE id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS alerts_rtree_ad AFTER DELETE ON alerts BEGIN
+        DELETE FROM alerts_rtree WHERE id = old.id;
+    END""",
+]
+
+
+def _rtree_available():
+    # Probe the same SQLite library on a throwaway connection
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE temp.probe USING rtree(id, a, b)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def install_spatial_index(conn):
+    """Create the R*Tree table and sync triggers (SQLite only). Returns True if enabled."""
+    global _rtree_enabled
+    if conn.dialect.name != 'sqlite' or not _rtree_available():
+        print("⚠️ R*Tree not available, using lat/lng index")
+        _rtree_enabled = False
+        return False
+
+    for statement in _RTREE_DDL:
+        conn.execute(text(statement))
+
+    # Rebuild if the index drifted (e.g. alerts written while the triggers were missing)
+    indexed = conn.execute(text("SELECT count(*) FROM alerts_rtree")).scalar()
+    total = conn.execute(text("SELECT count(*) FROM alerts")).scalar()
+    if indexed != total:
+        conn.execute(text("DELETE FROM alerts_rtree"))
+        conn.execute(text(
+            "INSERT INTO alerts_rtree (id, min_lat, max_lat, min_lng, max_lng) "
+            "SELECT id, latitude, latitude, longitude, longitude FROM alerts"
+        ))
+
+    _rtree_enabled = True
+    return True
+
+
+def detect_spatial_index(conn):
+    """Enable R*Tree queries if a migration already installed the index."""
+    global _rtree_enabled
+    _rtree_enabled = (
+        conn.dialect.name == 'sqlite'
+        and conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'alerts_rtree'")).first() is not None
+    )
+    return _rtree_enabled
+
+
+def parse_bbox(value):
+    """Parse 'min_lng,min_lat,max_lng,max_lat' (Leaflet toBBoxString order)."""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in value.split(','))
+    except (ValueError, AttributeError):
+        raise ValueError('bbox must be "min_lng,min_lat,max_lng,max_lat"')
+
+    if not (-90 <= min_lat <= 90 and -90 <= max_lat <= 90):
+        raise ValueError('bbox latitudes must be between -90 and 90')
+    if not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+        raise ValueError('bbox longitudes must be between -180 and 180')
+    if min_lat > max_lat:
+        raise ValueError('bbox min_lat must not exceed max_lat')
+
+    # min_lng > max_lng is allowed and means the box crosses the antimeridian
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def radius_bbox(lat, lng, radius_km):
+    """Smallest lat/lng box containing the circle (used as the index pre-filter)."""
+    d_lat = radius_km / KM_PER_DEGREE_LAT
+    min_lat = max(lat - d_lat, -90.0)
+    max_lat = min(lat + d_lat, 90.0)
+
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat < 1e-6 or radius_km / (KM_PER_DEGREE_LAT * cos_lat) >= 180:
+        # Circle touches a pole or wraps the globe: every longitude is a candidate
+        return -180.0, min_lat, 180.0, max_lat
+
+    d_lng = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    min_lng = lng - d_lng
+    max_lng = lng + d_lng
+    if min_lng < -180:
+        min_lng += 360
+    if max_lng > 180:
+        max_lng -= 360
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# Spatial hash used for near-duplicate lookups (Alert.geo_bucket): a fixed grid of
+# BUCKET_DEGREES cells. Stored in the database, so changing it needs a re-backfill.
+BUCKET_DEGREES = 0.01
+_BUCKET_COLS = int(round(360 / BUCKET_DEGREES))
+
+
+def geo_bucket(lat, lng):
+    row = int((lat + 90.0) // BUCKET_DEGREES)
+    col = int((lng + 180.0) // BUCKET_DEGREES) % _BUCKET_COLS
+    return row * _BUCKET_COLS + col
+
+
+def bucket_ids(bbox, limit=64):
+    """Ids of the buckets covering bbox, or None when more than `limit` would be needed."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    rows = range(int((min_lat + 90.0) // BUCKET_DEGREES), int((max_lat + 90.0) // BUCKET_DEGREES) + 1)
+    cols = []
+    for lo, hi in _lng_ranges(min_lng, max_lng):
+        cols.extend(range(int((lo + 180.0) // BUCKET_DEGREES), int((hi + 180.0) // BUCKET_DEGREES) + 1))
+    if len(rows) * len(cols) > limit:
+        return None
+    return sorted({row * _BUCKET_COLS + col % _BUCKET_COLS for row in rows for col in cols})
+
+
+def _lng_ranges(min_lng, max_lng):
+    if min_lng <= max_lng:
+        return [(min_lng, max_lng)]
+    return [(min_lng, 180.0), (-180.0, max_lng)]
+
+
+def bbox_filter(bbox):
+    """SQLAlchemy clause selecting alerts inside bbox, served by the spatial index."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    ranges = _lng_ranges(min_lng, max_lng)
+
+    exact = and_(
+        Alert.latitude.between(min_lat, max_lat),
+        or_(*[Alert.longitude.between(lo, hi) for lo, hi in ranges])
+    )
+    if not _rtree_enabled:
+        return exact
+
+    # R*Tree stores 32-bit floats rounded outwards, so keep the exact test as well
+    candidates = select(alerts_rtree.c.id).where(
+        alerts_rtree.c.max_lat >= min_lat,
+        alerts_rtree.c.min_lat <= max_lat,
+        or_(*[and_(alerts_rtree.c.max_lng >= lo, alerts_rtree.c.min_lng <= hi) for lo, hi in ranges])
+    )
+    return and_(Alert.id.in_(candidates), exact)
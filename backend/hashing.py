@@ -0,0 +1,84 @@
+# backend/hashing.py
+# bcrypt off the request threads: a small bounded worker pool that sheds load
+# (HashingOverloaded -> 503) instead of letting a login burst starve other requests.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full; routes answer 503 + Retry-After."""
+
+
+class PasswordHasher:
+    def __init__(self, bcrypt, rounds=12, workers=None, max_pending=64):
+        self.bcrypt = bcrypt
+        self.rounds = rounds
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.hashes = 0
+        self.checks = 0
+        self.rejected = 0
+        self.seconds = 0.0
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', self.rounds)
+        self.workers = app.config.get('BCRYPT_WORKERS', self.workers)
+        self.max_pending = app.config.get('BCRYPT_MAX_PENDING', self.max_pending)
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _run(self, fn, *args):
+        slots = self._slots
+        # Queued + running jobs are capped; beyond that we refuse instead of piling up
+        if not slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingOverloaded('Password hashing is saturated, retry shortly')
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+                executor = self._executor
+            return executor.submit(self._timed, fn, *args).result()
+        finally:
+            slots.release()
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def hash(self, password):
+        self.hashes += 1
+        return self._run(self.bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    def check(self, password_hash, password):
+        self.checks += 1
+        return self._run(self.bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when the stored hash ($2b$<cost>$...) uses a different cost than configured."""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
+
+    def stats(self):
+        return {
+            'rounds': self.rounds,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'hashes': self.hashes,
+            'checks': self.checks,
+            'rejected': self.rejected,
+            'seconds': round(self.seconds, 3)
+        }
@@ -0,0 +1,191 @@
+# backend/metrics.py
+# Prometheus text-format metrics without extra dependencies: request counts,
+# latency histograms and in-flight requests per endpoint, SQL timings, plus
+# the cache / hashing / stream counters the other modules already keep.
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+from sqlalchemy import event
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f'# TYPE {self.name} gauge'
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values = {}
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, list(counts), total) for key, (counts, total) in self._values.items())
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _format_labels(self.labels + ('le',), key + (le,))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, key)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+def _gauge_lines(name, documentation, samples, kind='gauge'):
+    """Render values read at scrape time: samples = [(labels dict, value)]."""
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+    for labels, value in samples:
+        lines.append(f'{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}')
+    return lines
+
+
+class Metrics:
+    """Registry plus the Flask/SQLAlchemy hooks that feed it."""
+
+    def __init__(self):
+        self.enabled = True
+        self.requests = Counter('http_requests_total', 'HTTP requests by endpoint and status.',
+                                ('blueprint', 'endpoint', 'method', 'status'))
+        self.latency = Histogram('http_request_duration_seconds', 'Time to build the response.',
+                                 ('blueprint', 'endpoint'))
+        self.in_flight = Gauge('http_requests_in_flight', 'Requests currently being handled.')
+        self.queries = Histogram('db_query_duration_seconds', 'SQL statement execution time.',
+                                 ('operation',), buckets=SQL_BUCKETS)
+        self._collected = [self.requests, self.latency, self.in_flight, self.queries]
+
+    def init_app(self, app, engine=None):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if engine is not None:
+            self.instrument_engine(engine)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    def instrument_engine(self, engine):
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            stack = conn.info.get('metrics_start')
+            if stack:
+                operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+                self.queries.observe(time.perf_counter() - stack.pop(), operation)
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        self.in_flight.inc()
+
+    def _after_request(self, response):
+        start = g.get('metrics_start')
+        if start is not None:
+            endpoint = request.endpoint or 'unmatched'
+            blueprint = request.blueprint or 'app'
+            # Streamed bodies (SSE, exports) are timed until the response object is ready
+            self.latency.observe(time.perf_counter() - start, blueprint, endpoint)
+            self.requests.inc(blueprint, endpoint, request.method, response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        if g.pop('metrics_start', None) is not None:
+            self.in_flight.dec()
+
+    def render(self):
+        # Importate aici: modulele de mai jos importă la rândul lor modelele
+        from cache import response_cache
+        from events import broker
+        from models import password_hasher
+        from security import identity_cache
+
+        lines = []
+        for metric in self._collected:
+            lines.extend(metric.render())
+
+        cache = response_cache.stats()
+        identity = identity_cache.stats()
+        lines += _gauge_lines('cache_hits_total', 'Cache lookups that hit.', [
+            ({'cache': 'response'}, cache['hits']), ({'cache': 'identity'}, identity['hits'])], 'counter')
+        lines += _gauge_lines('cache_misses_total', 'Cache lookups that missed.', [
+            ({'cache': 'response'}, cache['misses']), ({'cache': 'identity'}, identity['misses'])], 'counter')
+        lines += _gauge_lines('cache_entries', 'Entries currently cached.', [
+            ({'cache': 'response'}, cache['entries']), ({'cache': 'identity'}, identity['entries'])])
+        lines += _gauge_lines('response_cache_bytes', 'Bytes held by the response cache.', [({}, cache['bytes'])])
+
+        hashing = password_hasher.stats()
+        lines += _gauge_lines('bcrypt_operations_total', 'Password hashes and checks.', [
+            ({'operation': 'hash'}, hashing['hashes']), ({'operation': 'check'}, hashing['checks'])], 'counter')
+        lines += _gauge_lines('bcrypt_seconds_total', 'Time spent in bcrypt.', [({}, hashing['seconds'])], 'counter')
+        lines += _gauge_lines('bcrypt_rejected_total', 'Hashing requests shed with 503.',
+                              [({}, hashing['rejected'])], 'counter')
+
+        lines += _gauge_lines('sse_subscribers', 'Open /api/alerts/stream connections.',
+                              [({}, broker.stats()['subscribers'])])
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics()
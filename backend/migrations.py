@@ -0,0 +1,235 @@
+# backend/migrations.py
+# Versioned schema migrations and opt-in demo data seeding.
+#
+# Each step runs once, in order, inside one transaction guarded by a lock, so
+# several workers starting together never race on DDL. Steps must be idempotent
+# against databases created by older versions of the app (which used create_all).
+import time
+from datetime import datetime
+
+from sqlalchemy import Table, Column, Integer, DateTime, MetaData, bindparam, inspect, select, update, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateTable
+
+from models import db, User, Alert, AlertStat, MonitoringJob
+from geo import install_spatial_index, detect_spatial_index, geo_bucket
+from sync import ensure_counter
+from stats import rebuild as rebuild_stats
+from search import install_search_index, detect_search_index
+
+_meta = MetaData()
+schema_version = Table(
+    'schema_version', _meta,
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False),
+    Column('updated_at', DateTime, nullable=False)
+)
+
+# Arbitrary key for pg_advisory_xact_lock
+_PG_LOCK_KEY = 20240601
+
+# How long a SQLite migrator keeps retrying when another one holds the lock
+# past busy_timeout (a long step such as an index build on a big table)
+LOCK_WAIT_SECONDS = 600
+
+
+def _base_schema(conn):
+    db.metadata.create_all(conn)
+
+
+def _query_indexes(conn):
+    # Tables created before these indexes existed only get them here; indexes on
+    # columns added by later steps are created by those steps
+    for index in list(Alert.__table__.indexes) + list(User.__table__.indexes):
+        existing = {c['name'] for c in inspect(conn).get_columns(index.table.name)}
+        if all(column.name in existing for column in index.columns):
+            index.create(conn, checkfirst=True)
+
+
+def _spatial_index(conn):
+    install_spatial_index(conn)
+
+
+def _change_counter(conn):
+    ensure_counter(conn)
+
+
+def _stats_rollup(conn):
+    AlertStat.__table__.create(conn, checkfirst=True)
+    rebuild_stats(conn)
+
+
+def _stats_canonical_only(conn):
+    # Linked duplicates used to be counted; recount without them
+    rebuild_stats(conn)
+
+
+def _duplicate_tracking(conn):
+    existing = {c['name'] for c in inspect(conn).get_columns('alerts')}
+    if 'report_count' not in existing:
+        conn.execute(text('ALTER TABLE alerts ADD COLUMN report_count INTEGER NOT NULL DEFAULT 1'))
+    if 'canonical_id' not in existing:
+        conn.execute(text('ALTER TABLE alerts ADD COLUMN canonical_id INTEGER REFERENCES alerts (id)'))
+    if 'geo_bucket' not in existing:
+        conn.execute(text('ALTER TABLE alerts ADD COLUMN geo_bucket BIGINT'))
+    for index in Alert.__table__.indexes:
+        if 'geo_bucket' in index.columns:
+            index.create(conn, checkfirst=True)
+
+    alerts = Alert.__table__
+    rows = conn.execute(
+        select(alerts.c.id, alerts.c.latitude, alerts.c.longitude).where(alerts.c.geo_bucket.is_(None))
+    ).all()
+    if rows:
+        conn.execute(
+            update(alerts).where(alerts.c.id == bindparam('alert_id')).values(geo_bucket=bindparam('bucket')),
+            [{'alert_id': r.id, 'bucket': geo_bucket(r.latitude, r.longitude)} for r in rows]
+        )
+
+
+def _search_index(conn):
+    install_search_index(conn)
+
+
+def _monitoring_jobs(conn):
+    MonitoringJob.__table__.create(conn, checkfirst=True)
+
+
+# (index, table, leading equality columns) for every (created_at, id) keyset listing
+_KEYSET_INDEXES = [
+    ('ix_alerts_created_at_id', 'alerts', ()),
+    ('ix_alerts_user_created_at_id', 'alerts', ('user_id',)),
+    ('ix_alerts_status_created_at_id', 'alerts', ('status',)),
+    ('ix_alerts_type_created_at_id', 'alerts', ('type',)),
+    ('ix_user_created_at_id', 'user', ()),
+    ('ix_monitoring_jobs_created_at_id', 'monitoring_jobs', ()),
+]
+
+
+def _keyset_nulls_last(conn):
+    # Listings order by created_at DESC NULLS LAST (pagination.keyset_order). SQLite gets
+    # that from a backward scan of the plain index; PostgreSQL's backward scan puts NULLs
+    # first, so the indexes are rebuilt in the listing order there
+    if conn.dialect.name != 'postgresql':
+        return
+    quote = conn.dialect.identifier_preparer.quote
+    for name, table, prefix in _KEYSET_INDEXES:
+        columns = ', '.join([quote(c) for c in prefix] + ['created_at DESC NULLS LAST', 'id DESC'])
+        conn.execute(text(f'DROP INDEX IF EXISTS {quote(name)}'))
+        conn.execute(text(f'CREATE INDEX {quote(name)} ON {quote(table)} ({columns})'))
+
+
+MIGRATIONS = [
+    (1, 'base schema', _base_schema),
+    (2, 'alert and user query indexes', _query_indexes),
+    (3, 'alerts R*Tree spatial index', _spatial_index),
+    (4, 'alerts change counter', _change_counter),
+    (5, 'alert statistics rollup', _stats_rollup),
+    (6, 'alert duplicate tracking', _duplicate_tracking),
+    (7, 'alert full-text search index', _search_index),
+    (8, 'monitoring jobs', _monitoring_jobs),
+    (9, 'keyset indexes in NULLS LAST order', _keyset_nulls_last),
+    (10, 'alert statistics without linked duplicates', _stats_canonical_only),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _read_version(conn):
+    if not inspect(conn).has_table('schema_version'):
+        return 0
+    return conn.execute(select(schema_version.c.version).where(schema_version.c.id == 1)).scalar() or 0
+
+
+def _lock(conn):
+    """Serialize migrators; the lock is held until the transaction ends.
+
+    Must be the first statement of the connection's transaction: nothing, not
+    even the schema_version DDL, runs before the lock is held.
+    """
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _PG_LOCK_KEY})
+        stmt = postgresql.insert(schema_version)
+    elif conn.dialect.name == 'sqlite':
+        # Takes the database write lock now instead of at the first write
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+        stmt = sqlite.insert(schema_version)
+    else:
+        raise ValueError(f"Unsupported database backend '{conn.dialect.name}' for migrations")
+    conn.execute(CreateTable(schema_version, if_not_exists=True))
+    conn.execute(stmt.values(id=1, version=0, updated_at=datetime.utcnow()).on_conflict_do_nothing())
+
+
+def _is_locked(error):
+    return 'database is locked' in str(getattr(error, 'orig', error))
+
+
+def _acquire(engine, wait_seconds):
+    """Connection whose open transaction holds the migration lock."""
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        conn = engine.connect()
+        try:
+            _lock(conn)
+            return conn
+        except OperationalError as e:
+            conn.close()
+            # SQLite gives up after busy_timeout; keep waiting for the other migrator
+            if not _is_locked(e) or time.monotonic() >= deadline:
+                raise
+            time.sleep(0.5)
+        except Exception:
+            conn.close()
+            raise
+
+
+def upgrade(engine, wait_seconds=LOCK_WAIT_SECONDS):
+    """Apply pending migrations; returns the list of applied step names."""
+    with engine.connect() as conn:
+        current = _read_version(conn)
+        if current >= LATEST_VERSION:
+            detect_spatial_index(conn)
+            detect_search_index(conn)
+            return []
+
+    applied = []
+    conn = _acquire(engine, wait_seconds)
+    try:
+        # Re-read under the lock: another worker may have finished meanwhile
+        current = _read_version(conn)
+        for version, name, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(conn)
+            conn.execute(update(schema_version).where(schema_version.c.id == 1)
+                         .values(version=version, updated_at=datetime.utcnow()))
+            applied.append(name)
+        detect_spatial_index(conn)
+        detect_search_index(conn)
+        conn.commit()
+    finally:
+        # Rolls back if a step failed
+        conn.close()
+    return applied
+
+
+DEMO_USERS = [
+    {'name': 'Administrator', 'email': 'viewer2413q@gmail.com', 'password': 'admin123', 'role': 'admin'},
+    {'name': 'Andreea Test', 'email': 'andreea2.p.3@gmail.com', 'password': 'admin123', 'role': 'user'},
+    {'name': 'Admin', 'email': 'admin@treelives.com', 'password': 'admin123', 'role': 'admin'},
+]
+
+
+def seed_demo_users():
+    """Create the demo accounts that are missing (needs an app context)."""
+    existing = {email for (email,) in db.session.execute(
+        select(User.email).where(User.email.in_([u['email'] for u in DEMO_USERS]))
+    )}
+    created = []
+    for data in DEMO_USERS:
+        if data['email'] not in existing:
+            db.session.add(User(**data))
+            created.append(data['email'])
+    db.session.commit()
+    return created
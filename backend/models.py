@@ -2,10 +2,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from datetime import datetime
+from hashing import PasswordHasher
 
 # Initialize extensions
 db = SQLAlchemy()
 bcrypt = Bcrypt()
+# bcrypt runs on a bounded worker pool, not on the request thread (see hashing.py)
+password_hasher = PasswordHasher(bcrypt)
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -16,7 +19,12 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
     is_active = db.Column(db.Boolean, default=True)
-    
+
+    # Keyset pagination index (see pagination.py)
+    __table_args__ = (
+        db.Index('ix_user_created_at_id', 'created_at', 'id'),
+    )
+
     def __init__(self, name, email, password, role='user'):
         self.name = name
         self.email = email
@@ -29,10 +37,13 @@ class User(db.Model):
     
     @password.setter
     def password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
     
     def is_admin(self):
         return self.role == 'admin'
@@ -48,6 +59,10 @@ class User(db.Model):
             'is_active': self.is_active
         }
 
+# Valorile acceptate pentru Alert.type / Alert.status
+ALERT_TYPES = ['deforestation', 'fire', 'pollution', 'wildlife', 'other']
+ALERT_STATUSES = ['pending', 'investigating', 'resolved', 'rejected', 'solved']
+
 # Alert trebuie să fie la același nivel cu User, NU înăuntrul lui
 class Alert(db.Model):
     __tablename__ = 'alerts'
@@ -62,10 +77,29 @@ class Alert(db.Model):
     status = db.Column(db.String(50), default='pending')
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Raportări duplicate: contorul pe alerta canonică, legătura pe duplicatele păstrate (dedup.py)
+    report_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    canonical_id = db.Column(db.Integer, db.ForeignKey('alerts.id'))
+    geo_bucket = db.Column(db.BigInteger)
     
     # Relația cu User
     user = db.relationship('User', backref='alerts')
+
+    __table_args__ = (
+        # Fallback spatial index (SQLite also gets an R*Tree, see geo.py)
+        db.Index('ix_alerts_lat_lng', 'latitude', 'longitude'),
+        # Keyset pagination indexes (see pagination.py)
+        db.Index('ix_alerts_created_at_id', 'created_at', 'id'),
+        db.Index('ix_alerts_user_created_at_id', 'user_id', 'created_at', 'id'),
+        # Filtrele status/type din listări, cu aceeași ordonare
+        db.Index('ix_alerts_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_alerts_type_created_at_id', 'type', 'created_at', 'id'),
+        # Delta sync (updated_since=), see sync.py
+        db.Index('ix_alerts_updated_at_id', 'updated_at', 'id'),
+        # Near-duplicate lookup: spatial hash bucket + type + time window (dedup.py)
+        db.Index('ix_alerts_geo_bucket_type_created_at', 'geo_bucket', 'type', 'created_at'),
+    )
     
     def to_dict(self):
         return {
@@ -78,10 +112,92 @@ class Alert(db.Model):
             'accuracy': self.accuracy,
             'status': self.status,
             'user_id': self.user_id,
+            'report_count': self.report_count,
+            'canonical_id': self.canonical_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
-    
+
+
+# Contor de versiune per tabel, incrementat la fiecare modificare (ETag / delta sync)
+class ChangeCounter(db.Model):
+    __tablename__ = 'change_counters'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# Alertele șterse, ca clienții cu updated_since= să le poată elimina
+class AlertTombstone(db.Model):
+    __tablename__ = 'alert_tombstones'
+
+    alert_id = db.Column(db.Integer, primary_key=True)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+# Contoare agregate (status / type / day / region), ținute la zi în aceeași tranzacție (stats.py)
+class AlertStat(db.Model):
+    __tablename__ = 'alert_stats'
+
+    dimension = db.Column(db.String(20), primary_key=True)
+    key = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+JOB_STATUSES = ['queued', 'running', 'succeeded', 'failed']
+
+# Job de monitorizare NDVI pentru o zonă, rulat în fundal de monitoring.py (main_pipeline din alert.py)
+class MonitoringJob(db.Model):
+    __tablename__ = 'monitoring_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    bbox = db.Column(db.JSON, nullable=False)  # [min_lng, min_lat, max_lng, max_lat]
+    date_before = db.Column(db.String(10), nullable=False)
+    date_after = db.Column(db.String(10), nullable=False)
+    threshold = db.Column(db.Float, nullable=False, default=0.2)
+    resolution_m = db.Column(db.Float)
+    source = db.Column(db.String(20))
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    stage = db.Column(db.String(20))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Heartbeat while running: a stale value means the worker process died
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Dispatcher: next queued jobs that are due
+        db.Index('ix_monitoring_jobs_status_run_at', 'status', 'run_at'),
+        # Keyset pagination of the admin listing (see pagination.py)
+        db.Index('ix_monitoring_jobs_created_at_id', 'created_at', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'bbox': self.bbox,
+            'date_before': self.date_before,
+            'date_after': self.date_after,
+            'threshold': self.threshold,
+            'resolution_m': self.resolution_m,
+            'source': self.source,
+            'status': self.status,
+            'stage': self.stage,
+            'attempts': self.attempts,
+            'result': self.result,
+            'error': self.error,
+            'created_by': self.created_by,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
 
 # Adaugă la sfârșitul fișierului models.py pentru test
 if __name__ == "__main__":
@@ -0,0 +1,259 @@
+# backend/monitoring.py
+# Background NDVI monitoring: a dispatcher thread claims due MonitoringJob rows
+# and runs alert.main_pipeline for each on a bounded worker pool.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from models import db, MonitoringJob
+from sync import parse_since
+
+def _date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a YYYY-MM-DD date')
+
+
+def parse_job_spec(spec):
+    """Validate one job body from the API; returns MonitoringJob column values."""
+    if not isinstance(spec, dict):
+        raise ValueError('Each job must be a JSON object')
+
+    bbox = spec.get('bbox')
+    if (not isinstance(bbox, list) or len(bbox) != 4
+            or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in bbox)):
+        raise ValueError('bbox must be [min_lng, min_lat, max_lng, max_lat]')
+    min_lng, min_lat, max_lng, max_lat = (float(v) for v in bbox)
+    if not (-180 <= min_lng < max_lng <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise ValueError('bbox is out of range or has min >= max')
+
+    date_before = _date(spec.get('date_before'), 'date_before')
+    date_after = _date(spec.get('date_after'), 'date_after')
+    if date_before >= date_after:
+        raise ValueError('date_before must be earlier than date_after')
+
+    threshold = spec.get('threshold', 0.2)
+    if not isinstance(threshold, (int, float)) or isinstance(threshold, bool) or not 0 < threshold <= 2:
+        raise ValueError('threshold must be a number in (0, 2]')
+
+    resolution_m = spec.get('resolution_m')
+    if resolution_m is not None and (not isinstance(resolution_m, (int, float)) or isinstance(resolution_m, bool)
+                                     or resolution_m < 1):
+        raise ValueError('resolution_m must be a number >= 1')
+
+    # alert.py loads numpy/PIL and the integrations' config: imported on submit, not at app start
+    from alert import DATA_SOURCES, tile_grid
+    source = spec.get('source')
+    if source is not None and source not in DATA_SOURCES:
+        raise ValueError(f'Invalid source. Must be one of: {", ".join(DATA_SOURCES)}')
+    # Same check the pipeline does, so an oversized area is a 400 now and not a failed job later
+    tile_grid([min_lng, min_lat, max_lng, max_lat], resolution_m)
+
+    run_at = datetime.utcnow()
+    if spec.get('run_at'):
+        try:
+            run_at = parse_since(spec['run_at'])
+        except ValueError:
+            raise ValueError('run_at must be an ISO-8601 timestamp')
+
+    return {
+        'bbox': [min_lng, min_lat, max_lng, max_lat],
+        'date_before': date_before,
+        'date_after': date_after,
+        'threshold': float(threshold),
+        'resolution_m': float(resolution_m) if resolution_m is not None else None,
+        'source': source,
+        'run_at': run_at,
+    }
+
+
+class MonitoringWorker:
+    """Runs queued jobs whose run_at is due, at most `workers` at a time.
+
+    Jobs are claimed with a conditional UPDATE (queued -> running), so several
+    app processes can share one database without running a job twice. Running
+    jobs get a heartbeat every poll; a job whose heartbeat is older than
+    stale_minutes belonged to a dead process and is queued again.
+
+    init_app() only reads the configuration. Threads are started explicitly by
+    long-lived processes (python run.py, flask --app run monitoring-worker), never
+    by the app factory: CLI commands and benchmarks would otherwise claim jobs
+    and exit halfway through them.
+    """
+
+    def __init__(self, workers=2, retries=2, poll_seconds=5.0, stale_minutes=15, tile_workers=4, enabled=True):
+        self.workers = workers
+        self.retries = retries
+        self.poll_seconds = poll_seconds
+        self.stale_minutes = stale_minutes
+        self.tile_workers = tile_workers
+        self.enabled = enabled
+        self.app = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._active = set()
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+
+    def init_app(self, app):
+        self.workers = app.config.get('MONITORING_WORKERS', self.workers)
+        self.retries = app.config.get('MONITORING_RETRIES', self.retries)
+        self.poll_seconds = app.config.get('MONITORING_POLL_SECONDS', self.poll_seconds)
+        self.stale_minutes = app.config.get('MONITORING_STALE_MINUTES', self.stale_minutes)
+        self.tile_workers = app.config.get('MONITORING_TILE_WORKERS', self.tile_workers)
+        self.enabled = app.config.get('MONITORING_ENABLED', self.enabled)
+        self.app = app
+
+    @property
+    def started(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='monitoring')
+            self._thread = threading.Thread(target=self._dispatch_loop, name='monitoring-dispatcher', daemon=True)
+            self._thread.start()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            thread, executor = self._thread, self._executor
+            self._thread = None
+        if thread is not None and wait:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def run_forever(self):
+        """Run the dispatcher in the foreground until interrupted (dedicated worker process)."""
+        self.start()
+        thread = self._thread
+        try:
+            while thread.is_alive():
+                thread.join(timeout=1)
+        except KeyboardInterrupt:
+            print("⏹️ Stopping monitoring worker, waiting for running jobs...")
+        finally:
+            self.stop()
+
+    def wake(self):
+        """Check for due jobs now instead of at the next poll (called after enqueueing)."""
+        self._wake.set()
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self._heartbeat()
+                    with self._lock:
+                        free = self.workers - len(self._active)
+                    for job_id in self._claim(free) if free > 0 else []:
+                        with self._lock:
+                            self._active.add(job_id)
+                        self._executor.submit(self._run, job_id)
+            except Exception as e:
+                db.session.remove()
+                print(f"❌ Monitoring dispatcher error: {e}")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def _heartbeat(self):
+        now = datetime.utcnow()
+        with self._lock:
+            active = list(self._active)
+        if active:
+            db.session.execute(update(MonitoringJob).where(MonitoringJob.id.in_(active)).values(updated_at=now))
+        stale = db.session.execute(
+            update(MonitoringJob)
+            .where(MonitoringJob.status == 'running', MonitoringJob.updated_at < now - timedelta(minutes=self.stale_minutes))
+            .values(status='queued', stage=None, updated_at=now)
+        ).rowcount
+        db.session.commit()
+        if stale:
+            self.requeued += stale
+            print(f"⚠️ Requeued {stale} monitoring job(s) left running by a dead worker")
+
+    def _claim(self, limit):
+        now = datetime.utcnow()
+        due = db.session.execute(
+            select(MonitoringJob.id)
+            .where(MonitoringJob.status == 'queued', MonitoringJob.run_at <= now)
+            .order_by(MonitoringJob.run_at, MonitoringJob.id)
+            .limit(limit)
+        ).scalars().all()
+        claimed = []
+        for job_id in due:
+            # Only one process wins the queued -> running transition
+            result = db.session.execute(
+                update(MonitoringJob)
+                .where(MonitoringJob.id == job_id, MonitoringJob.status == 'queued')
+                .values(status='running', stage=None, error=None, started_at=now, updated_at=now)
+            )
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        db.session.commit()
+        return claimed
+
+    def _run(self, job_id):
+        try:
+            with self.app.app_context():
+                job = db.session.get(MonitoringJob, job_id)
+
+                def on_stage(stage, attempt):
+                    job.stage = stage
+                    job.attempts += 1
+                    db.session.commit()
+
+                try:
+                    # numpy / sentinelhub / web3 are only needed here, not by the web app
+                    from alert import main_pipeline
+                    result = main_pipeline(job.bbox, job.date_before, job.date_after, job.threshold,
+                                           job.resolution_m, self.tile_workers, job.source,
+                                           retries=self.retries, on_stage=on_stage)
+                except Exception as e:
+                    db.session.rollback()
+                    result = {'error': f'{type(e).__name__}: {e}'}
+
+                job.finished_at = datetime.utcnow()
+                if 'error' in result:
+                    job.status = 'failed'
+                    job.error = result['error']
+                    self.failed += 1
+                else:
+                    job.status = 'succeeded'
+                    job.result = result
+                    self.completed += 1
+                db.session.commit()
+        except Exception as e:
+            print(f"❌ Monitoring job {job_id} error: {e}")
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+            self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            running = len(self._active)
+        return {
+            'enabled': self.enabled,
+            'started': self.started,
+            'workers': self.workers,
+            'running': running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'requeued': self.requeued
+        }
+
+
+monitoring_worker = MonitoringWorker()
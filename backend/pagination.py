@@ -0,0 +1,77 @@
+# backend/pagination.py
+# Keyset (cursor) pagination on (created_at, id), newest first.
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at, row_id):
+    payload = [created_at.isoformat() if created_at else None, row_id]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from an opaque cursor; raises ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        created_at = datetime.fromisoformat(created_at) if created_at is not None else None
+        return created_at, int(row_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+
+def page_args(args, default_limit, max_limit):
+    """Read limit/cursor query params; returns (limit, decoded cursor or None)."""
+    limit = args.get('limit', default_limit, type=int)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    limit = min(limit, max_limit)
+
+    cursor = args.get('cursor')
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+def keyset_order(model):
+    # NULLS LAST explicitly: SQLite does it by default under DESC, PostgreSQL does not
+    return model.created_at.desc().nulls_last(), model.id.desc()
+
+
+def keyset_filter(model, cursor):
+    """Rows strictly after the cursor in (created_at DESC NULLS LAST, id DESC) order."""
+    created_at, row_id = cursor
+    if created_at is None:
+        # NULL created_at rows come after every dated row
+        return and_(model.created_at.is_(None), model.id < row_id)
+    return or_(
+        model.created_at < created_at,
+        and_(model.created_at == created_at, model.id < row_id),
+        model.created_at.is_(None)
+    )
+
+
+def split_page(rows, limit):
+    """Given up to limit + 1 rows, return (page, next_cursor or None if last page)."""
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.created_at, last.id)
+
+
+def paginate(query, model, limit, cursor):
+    """Fetch one page (limit + 1 rows to detect the end); returns (items, next_cursor)."""
+    if cursor:
+        query = query.filter(keyset_filter(model, cursor))
+    rows = query.order_by(*keyset_order(model)).limit(limit + 1).all()
+    return split_page(rows, limit)
+
+
+def paginate_select(session, stmt, model, limit, cursor):
+    """paginate() for a column-only select(); returns (rows, next_cursor)."""
+    if cursor:
+        stmt = stmt.where(keyset_filter(model, cursor))
+    rows = session.execute(stmt.order_by(*keyset_order(model)).limit(limit + 1)).all()
+    return split_page(rows, limit)
@@ -0,0 +1,149 @@
+# backend/profiling.py
+# Opt-in per-request SQL profiling: every statement a request runs, its time,
+# and identical statements repeated many times (N+1 patterns, e.g. a lazy
+# Alert.user load inside a loop).
+import logging
+import threading
+import time
+
+from flask import g, has_request_context, json, request
+from sqlalchemy import event
+
+logger = logging.getLogger('sql_profile')
+
+PROFILE_HEADER = 'X-SQL-Profile'
+
+
+class RequestProfile:
+    def __init__(self, full=False):
+        self.full = full
+        self.count = 0
+        self.seconds = 0.0
+        # statement text (parameters are placeholders, so N+1 loops collapse) -> [count, seconds]
+        self.statements = {}
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        entry = self.statements.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def repeated(self, threshold):
+        return [(sql, n, s) for sql, (n, s) in self.statements.items() if n >= threshold]
+
+    def summary(self, threshold, top=20):
+        ranked = sorted(self.statements.items(), key=lambda item: -item[1][1])[:top]
+        return {
+            'count': self.count,
+            'time_ms': round(self.seconds * 1000, 3),
+            'statements': [{'sql': sql, 'count': n, 'time_ms': round(s * 1000, 3), 'repeated': n >= threshold}
+                           for sql, (n, s) in ranked]
+        }
+
+
+class SQLProfiler:
+    """Enabled for every request with SQL_PROFILE_ALL, or per request with the
+    X-SQL-Profile header when SQL_PROFILE_HEADER is set (defaults to app.debug as
+    known when init_app runs, i.e. flask --debug; python run.py sets it explicitly).
+    With neither, no hooks are installed at all.
+    """
+
+    def __init__(self):
+        self.profile_all = False
+        self.allow_header = False
+        self.repeat_threshold = 5
+        self.slow_ms = 200
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def init_app(self, app, engine):
+        self.profile_all = app.config.get('SQL_PROFILE_ALL', False)
+        self.allow_header = app.config.get('SQL_PROFILE_HEADER', app.debug)
+        self.repeat_threshold = app.config.get('SQL_PROFILE_REPEAT_THRESHOLD', self.repeat_threshold)
+        self.slow_ms = app.config.get('SQL_PROFILE_SLOW_MS', self.slow_ms)
+        if not (self.profile_all or self.allow_header):
+            return
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        self._instrument(engine)
+
+    @property
+    def enabled(self):
+        return self.profile_all or self.allow_header
+
+    def _instrument(self, engine):
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if has_request_context() and g.get('sql_profile') is not None:
+                conn.info.setdefault('profile_start', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            stack = conn.info.get('profile_start')
+            if stack and has_request_context():
+                profile = g.get('sql_profile')
+                if profile is not None:
+                    profile.record(statement, time.perf_counter() - stack.pop())
+
+    def _start(self):
+        mode = request.headers.get(PROFILE_HEADER, '').lower() if self.allow_header else ''
+        if self.profile_all or mode:
+            g.sql_profile = RequestProfile(full=mode == 'full')
+
+    def _finish(self, response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+
+        repeated = profile.repeated(self.repeat_threshold)
+        response.headers['X-SQL-Count'] = str(profile.count)
+        response.headers['X-SQL-Time-Ms'] = f'{profile.seconds * 1000:.3f}'
+        response.headers['X-SQL-Repeated'] = str(len(repeated))
+
+        # X-SQL-Profile: full -> statement breakdown in the JSON body as well
+        if profile.full and response.is_json and not response.is_streamed:
+            data = response.get_json(silent=True)
+            if isinstance(data, dict):
+                data['_sql_profile'] = profile.summary(self.repeat_threshold)
+                response.set_data(json.dumps(data))
+
+        endpoint = request.endpoint or 'unmatched'
+        self._aggregate(endpoint, profile, bool(repeated))
+        for sql, count, seconds in repeated:
+            logger.warning('N+1 suspect on %s: %dx (%.1f ms) %s', endpoint, count, seconds * 1000,
+                           ' '.join(sql.split())[:300])
+        if profile.seconds * 1000 >= self.slow_ms:
+            logger.warning('Slow SQL on %s: %d statements, %.1f ms', endpoint, profile.count, profile.seconds * 1000)
+        else:
+            logger.debug('%s: %d statements, %.1f ms', endpoint, profile.count, profile.seconds * 1000)
+        return response
+
+    def _aggregate(self, endpoint, profile, repeated):
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'statements': 0, 'time_ms': 0.0, 'max_statements': 0, 'n_plus_one_requests': 0
+            })
+            entry['requests'] += 1
+            entry['statements'] += profile.count
+            entry['time_ms'] += profile.seconds * 1000
+            entry['max_statements'] = max(entry['max_statements'], profile.count)
+            entry['n_plus_one_requests'] += int(repeated)
+
+    def report(self):
+        """Per-endpoint totals, slowest (total SQL time) first."""
+        with self._lock:
+            items = [(name, dict(entry)) for name, entry in self._endpoints.items()]
+        report = []
+        for name, entry in sorted(items, key=lambda item: -item[1]['time_ms']):
+            entry['time_ms'] = round(entry['time_ms'], 3)
+            entry['avg_statements'] = round(entry['statements'] / entry['requests'], 2)
+            report.append({'endpoint': name, **entry})
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+sql_profiler = SQLProfiler()
@@ -0,0 +1,154 @@
+# backend/raster_cache.py
+# Content-keyed on-disk cache of Sentinel band rasters for alert.py. Past
+# imagery never changes, so a (bbox, date, size, evalscript, filter) request
+# is downloaded once and afterwards memory-mapped from a .npy file.
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def raster_key(bbox, date, size, evalscript, max_cloud_coverage, collection=''):
+    """Stable hex key for one band request; every input that changes the pixels is part of it."""
+    parts = {
+        # Rounded so float noise from tile arithmetic does not split the cache
+        'bbox': [round(float(c), 7) for c in bbox],
+        'date': date,
+        'size': [int(s) for s in size],
+        'evalscript': hashlib.sha256(evalscript.encode('utf-8')).hexdigest(),
+        'max_cloud_coverage': max_cloud_coverage,
+        'collection': collection,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()[:40]
+
+
+class RasterCache:
+    """Size-bounded LRU of .npy files under `directory`.
+
+    Recency is the file's mtime (bumped on every hit), so the LRU order
+    survives restarts; the index is rebuilt from the directory on first use.
+    Hits are returned as read-only memory maps.
+    """
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3, enabled=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries = None  # key -> size in bytes, least recently used first
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        # Two-level fan-out keeps directories small with thousands of tiles
+        return os.path.join(self.directory, key[:2], key + '.npy')
+
+    def _load_index(self):
+        if self._entries is not None:
+            return
+        found = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.endswith('.npy'):
+                        stat = os.stat(os.path.join(root, name))
+                        found.append((stat.st_mtime, name[:-4], stat.st_size))
+        found.sort()
+        self._entries = OrderedDict((key, size) for _, key, size in found)
+        self._bytes = sum(self._entries.values())
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        with self._lock:
+            self._load_index()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(path)
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            # Deleted or truncated behind our back: treat as a miss
+            with self._lock:
+                self._forget(key)
+                self.hits -= 1
+                self.misses += 1
+            return None
+
+    def put(self, key, array):
+        if not self.enabled:
+            return
+        array = np.ascontiguousarray(array)
+        if array.nbytes > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename, so readers never see a partial .npy
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        size = os.path.getsize(path)
+
+        with self._lock:
+            self._load_index()
+            self._forget(key)
+            self._entries[key] = size
+            self._bytes += size
+            self.writes += 1
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._forget(oldest)
+                try:
+                    os.remove(self._path(oldest))
+                except OSError:
+                    pass
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._load_index()
+            for key in list(self._entries):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'directory': self.directory,
+                'entries': len(self._entries) if self._entries is not None else None,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'writes': self.writes,
+                'evictions': self.evictions
+            }
+
+    def _forget(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._bytes -= size
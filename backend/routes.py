@@ -1,8 +1,28 @@
 # backend/routes.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from models import User, Alert, db  # Import Alert model
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import User, Alert, MonitoringJob, db, ALERT_TYPES, ALERT_STATUSES, JOB_STATUSES, password_hasher  # Import Alert model
+from hashing import HashingOverloaded
+from geo import parse_bbox, radius_bbox, bbox_filter, haversine_km, geo_bucket
+from dedup import find_duplicate
+from search import search_terms, search_statement
+from pagination import page_args, paginate, paginate_select, keyset_filter, keyset_order, split_page
+from serialize import alert_select, alert_dicts, alert_columns, dumps, wants_columnar, COLUMNAR_MIMETYPE
+from sync import current_version, make_etag, not_modified, parse_since, alert_delta, bump_version
+from events import broker
+from cache import response_cache, alert_state
+from density import cluster_index, MAX_ZOOM, heatmap_grid, encode_uint16, encode_png, MAX_HEATMAP_RESOLUTION
+from snapshot import alert_snapshot, TYPE_LABELS
+from export import export_stream, FORMATS as EXPORT_FORMATS
+from stats import alert_stats, apply_deltas, row_keys
+from profiling import sql_profiler
+from compress import compressor
+from monitoring import monitoring_worker, parse_job_spec
+from security import admin_required, user_required, current_identity, issue_token, identity_cache
+from sqlalchemy import and_, insert, select, update
+from collections import Counter
 from datetime import datetime
+import json
 import re
 
 # Blueprints
@@ -17,6 +37,12 @@ def validate_email(email):
 def validate_password(password):
     return len(password) >= 6
 
+def _hashing_overloaded():
+    # Hashing pool saturat: clientul reîncearcă, celelalte cereri nu așteaptă după bcrypt
+    response = jsonify({'error': 'Authentication service busy, please retry shortly'})
+    response.headers['Retry-After'] = str(current_app.config.get('BCRYPT_RETRY_AFTER', 1))
+    return response, 503
+
 def validate_coordinates(lat, lng):
     try:
         lat = float(lat)
@@ -25,6 +51,120 @@ def validate_coordinates(lat, lng):
     except (ValueError, TypeError):
         return False
 
+ALERT_REQUIRED_FIELDS = ['title', 'description', 'type', 'latitude', 'longitude']
+
+def validate_alert_payload(data):
+    """Validate one alert payload; returns (fields, None) or (None, error message)."""
+    if not isinstance(data, dict) or not all(k in data for k in ALERT_REQUIRED_FIELDS):
+        return None, f'Missing required fields: {", ".join(ALERT_REQUIRED_FIELDS)}'
+
+    if not isinstance(data['title'], str) or not isinstance(data['description'], str):
+        return None, 'Title and description must be strings'
+
+    title = data['title'].strip()
+    description = data['description'].strip()
+    alert_type = data['type']
+    latitude = data['latitude']
+    longitude = data['longitude']
+    accuracy = data.get('accuracy', 0)
+
+    # Validări
+    if len(title) < 3 or len(title) > 100:
+        return None, 'Title must be between 3 and 100 characters'
+
+    if len(description) < 10 or len(description) > 500:
+        return None, 'Description must be between 10 and 500 characters'
+
+    if alert_type not in ALERT_TYPES:
+        return None, f'Invalid alert type. Must be one of: {", ".join(ALERT_TYPES)}'
+
+    if not validate_coordinates(latitude, longitude):
+        return None, 'Invalid coordinates'
+
+    try:
+        accuracy = float(accuracy) if accuracy else 0
+    except (ValueError, TypeError):
+        return None, 'Accuracy must be a number'
+
+    return {
+        'title': title,
+        'description': description,
+        'type': alert_type,
+        'latitude': float(latitude),
+        'longitude': float(longitude),
+        'accuracy': accuracy
+    }, None
+
+def _parse_circle(args):
+    lat = args.get('lat', type=float)
+    lng = args.get('lng', type=float)
+    radius_km = args.get('radius_km', type=float)
+    if lat is None or lng is None or radius_km is None:
+        raise ValueError('lat, lng and radius_km must be provided together')
+    if not validate_coordinates(lat, lng):
+        raise ValueError('Invalid coordinates')
+    if radius_km <= 0:
+        raise ValueError('radius_km must be positive')
+    return lat, lng, radius_km
+
+def _not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def _with_etag(payload, etag, status=200):
+    response = Response(dumps(payload), status=status, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+def _alert_list(body, etag, columnar):
+    # Același URL, două reprezentări (JSON pe rânduri sau columnar) după Accept
+    response = Response(body, mimetype=COLUMNAR_MIMETYPE if columnar else 'application/json')
+    response.set_etag(etag)
+    response.vary.add('Accept')
+    return response
+
+def _cached_json(body, etag=None):
+    response = Response(body, mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+    return response, 200
+
+def _alert_changed(event, alert, before=None):
+    # Apelat după commit: invalidează cache-ul și notifică abonații SSE
+    response_cache.invalidate_alert(before, alert_state(alert))
+    broker.publish(event, alert.to_dict())
+
+# Peste acest prag un lot nu mai e tratat alertă cu alertă
+BULK_EVENT_THRESHOLD = 50
+
+def _alerts_created_bulk(rows):
+    if not rows:
+        return
+    if len(rows) > BULK_EVENT_THRESHOLD:
+        # Un singur eveniment: clienții SSE fac un delta sync în loc să primească mii de mesaje
+        response_cache.clear()
+        broker.publish('bulk', {'created': len(rows), 'ids': [rows[0]['id'], rows[-1]['id']]})
+        return
+    response_cache.invalidate_alert(*rows)
+    for row in rows:
+        broker.publish('created', {
+            **{k: v for k, v in row.items() if k not in ('created_at', 'updated_at')},
+            'created_at': row['created_at'].isoformat(),
+            'updated_at': row['updated_at'].isoformat()
+        })
+
+def _alerts_updated_bulk(before, status):
+    if not before:
+        return
+    if len(before) > BULK_EVENT_THRESHOLD:
+        response_cache.clear()
+        broker.publish('bulk', {'updated': len(before), 'status': status})
+        return
+    response_cache.invalidate_alert(*before, *({**state, 'status': status} for state in before))
+    for alert in Alert.query.filter(Alert.id.in_([state['id'] for state in before])).order_by(Alert.id):
+        broker.publish('updated', alert.to_dict())
+
 # Authentication routes
 @auth_bp.route('/register', methods=['POST'])
 def register():
@@ -63,7 +203,7 @@ def register():
         db.session.commit()
 
         # Creează token
-        access_token = create_access_token(identity=str(user.id))
+        access_token = issue_token(user)
 
         return jsonify({
             'message': 'User registered successfully',
@@ -71,6 +211,9 @@ def register():
             'user': user.to_dict()
         }), 201
 
+    except HashingOverloaded:
+        db.session.rollback()
+        return _hashing_overloaded()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Registration failed: ' + str(e)}), 500
@@ -95,12 +238,16 @@ def login():
         if not user.is_active:
             return jsonify({'error': 'Account is deactivated'}), 401
 
+        # Costul bcrypt s-a schimbat (BCRYPT_LOG_ROUNDS): re-criptăm cu parola corectă primită acum
+        if user.password_needs_rehash():
+            user.password = password
+
         # Update last login
         user.last_login = datetime.utcnow()
         db.session.commit()
 
         # Creează token
-        access_token = create_access_token(identity=str(user.id))
+        access_token = issue_token(user)
 
         return jsonify({
             'message': 'Login successful',
@@ -108,6 +255,9 @@ def login():
             'user': user.to_dict()
         }), 200
 
+    except HashingOverloaded:
+        db.session.rollback()
+        return _hashing_overloaded()
     except Exception as e:
         return jsonify({'error': 'Login failed: ' + str(e)}), 500
 
@@ -167,74 +317,70 @@ def update_profile():
                 return jsonify({'error': 'Password must be at least 6 characters'}), 400
 
         db.session.commit()
+        identity_cache.invalidate(user.id)
 
         return jsonify({
             'message': 'Profile updated successfully',
             'user': user.to_dict()
         }), 200
 
+    except HashingOverloaded:
+        db.session.rollback()
+        return _hashing_overloaded()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to update profile: ' + str(e)}), 500
 
 # Alert routes
 @main_bp.route('/alerts', methods=['POST'])
-@jwt_required()
+@user_required
 def create_alert():
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-            
-        # Allow both regular users and admins to create alerts
-        if user.role not in ['user', 'admin']:
-            return jsonify({'error': 'Only authenticated users can create alerts'}), 403
-        
-        data = request.get_json()
-        
-        # Validare input
-        required_fields = ['title', 'description', 'type', 'latitude', 'longitude']
-        if not data or not all(k in data for k in required_fields):
-            return jsonify({'error': f'Missing required fields: {", ".join(required_fields)}'}), 400
-        
-        title = data['title'].strip()
-        description = data['description'].strip()
-        alert_type = data['type']
-        latitude = data['latitude']
-        longitude = data['longitude']
-        accuracy = data.get('accuracy', 0)
-        
-        # Validări
-        if len(title) < 3 or len(title) > 100:
-            return jsonify({'error': 'Title must be between 3 and 100 characters'}), 400
-            
-        if len(description) < 10 or len(description) > 500:
-            return jsonify({'error': 'Description must be between 10 and 500 characters'}), 400
-            
-        valid_types = ['deforestation', 'fire', 'pollution', 'wildlife', 'other']
-        if alert_type not in valid_types:
-            return jsonify({'error': f'Invalid alert type. Must be one of: {", ".join(valid_types)}'}), 400
-            
-        if not validate_coordinates(latitude, longitude):
-            return jsonify({'error': 'Invalid coordinates'}), 400
-        
+        user_id = current_identity().id
+
+        fields, error = validate_alert_payload(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
+
+        fields['geo_bucket'] = geo_bucket(fields['latitude'], fields['longitude'])
+
+        # Același incident raportat de mai mulți utilizatori în câteva minute
+        config = current_app.config
+        duplicate = None
+        if config.get('DEDUP_ENABLED', True):
+            duplicate = find_duplicate(fields, config.get('DEDUP_RADIUS_M', 250), config.get('DEDUP_WINDOW_MINUTES', 30))
+
+        if duplicate is not None:
+            before = alert_state(duplicate)
+            duplicate.report_count = Alert.report_count + 1
+            alert = None
+            if config.get('DEDUP_MODE', 'merge') == 'link':
+                # Keep the report as its own row, linked to the canonical alert
+                alert = Alert(**fields, user_id=user_id, status='pending', canonical_id=duplicate.id)
+                db.session.add(alert)
+            db.session.commit()
+            _alert_changed('updated', duplicate, before)
+
+            if alert is None:
+                return jsonify({
+                    'message': 'Alert merged into an existing report',
+                    'alert': duplicate.to_dict(),
+                    'duplicate_of': duplicate.id
+                }), 200
+            _alert_changed('created', alert)
+            return jsonify({
+                'message': 'Alert created and linked to an existing report',
+                'alert': alert.to_dict(),
+                'duplicate_of': duplicate.id
+            }), 201
+
         # Creează alerta
-        alert = Alert(
-            title=title,
-            description=description,
-            type=alert_type,
-            latitude=float(latitude),
-            longitude=float(longitude),
-            accuracy=float(accuracy) if accuracy else 0,
-            user_id=user_id,
-            status='pending'
-        )
-        
+        alert = Alert(**fields, user_id=user_id, status='pending')
+
         db.session.add(alert)
         db.session.commit()
-        
+        _alert_changed('created', alert)
+
         return jsonify({
             'message': 'Alert created successfully',
             'alert': alert.to_dict()
@@ -244,70 +390,355 @@ def create_alert():
         db.session.rollback()
         return jsonify({'error': 'Failed to create alert: ' + str(e)}), 500
 
+_INVALID_JSON = object()
+
+def _read_batch_items():
+    """Alert payloads from a JSON array ({'alerts': [...]} also accepted) or an NDJSON body."""
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                # Linia invalidă devine un rezultat cu eroare, nu respinge tot lotul
+                items.append(_INVALID_JSON)
+        return items
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('alerts')
+    if not isinstance(data, list):
+        raise ValueError('Body must be a JSON array of alerts or NDJSON')
+    return data
+
+@main_bp.route('/alerts/batch', methods=['POST'])
+@user_required
+def create_alerts_batch():
+    try:
+        user_id = current_identity().id
+
+        try:
+            items = _read_batch_items()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        max_items = current_app.config.get('ALERT_BATCH_MAX', 10000)
+        if not items:
+            return jsonify({'error': 'No alerts provided'}), 400
+        if len(items) > max_items:
+            return jsonify({'error': f'Too many alerts in one batch (max {max_items})'}), 413
+
+        # Validare într-o singură trecere; rândurile valide se inserează împreună
+        results = [None] * len(items)
+        rows, positions = [], []
+        now = datetime.utcnow()
+        for index, item in enumerate(items):
+            if item is _INVALID_JSON:
+                fields, error = None, 'Invalid JSON line'
+            else:
+                fields, error = validate_alert_payload(item)
+            if error:
+                results[index] = {'index': index, 'status': 'error', 'error': error}
+                continue
+            rows.append({**fields, 'geo_bucket': geo_bucket(fields['latitude'], fields['longitude']),
+                         'user_id': user_id, 'status': 'pending', 'created_at': now, 'updated_at': now})
+            positions.append(index)
+
+        ids = []
+        if rows:
+            # insertmanyvalues: INSERT ... VALUES (...), (...) RETURNING id, one transaction, one commit
+            ids = db.session.execute(
+                insert(Alert).returning(Alert.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            bump_version(db.session.connection())
+            # Core insert ocolește listener-ul ORM: actualizăm rollup-ul explicit
+            apply_deltas(db.session.connection(), Counter(key for row in rows for key in row_keys(row)))
+            db.session.commit()
+
+        for index, alert_id in zip(positions, ids):
+            results[index] = {'index': index, 'status': 'created', 'id': alert_id}
+        _alerts_created_bulk([{**row, 'id': alert_id} for row, alert_id in zip(rows, ids)])
+
+        return jsonify({
+            'message': f'{len(ids)} of {len(items)} alerts created',
+            'created': len(ids),
+            'failed': len(items) - len(ids),
+            'results': results
+        }), 201 if ids else 400
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to create alerts: ' + str(e)}), 500
+
 @main_bp.route('/alerts', methods=['GET'])
 def get_alerts():
     try:
-        # Parametri opționali pentru filtrare
-        status = request.args.get('status')
+        # Poll fără modificări de la ultimul răspuns: 304 fără să atingem ORM-ul
+        columnar = wants_columnar(request)
+        version = current_version()
+        etag = make_etag(version, 'columnar' if columnar else '')
+        if not_modified(etag):
+            response = _not_modified(etag)
+            response.vary.add('Accept')
+            return response
+
+        try:
+            if 'updated_since' in request.args:
+                return _with_etag(alert_delta(parse_since(request.args['updated_since'])), etag)
+
+            # Parametri opționali pentru filtrare
+            filters = {
+                'status': request.args.get('status') or None,
+                'type': request.args.get('type') or None,
+                'bbox': None,
+                'circle': None
+            }
+            limit, cursor = page_args(request.args, 50, 500)
+
+            # Filtrare spațială: bbox=min_lng,min_lat,max_lng,max_lat și/sau lat/lng/radius_km
+            if request.args.get('bbox'):
+                filters['bbox'] = parse_bbox(request.args['bbox'])
+            if any(k in request.args for k in ('lat', 'lng', 'radius_km')):
+                filters['circle'] = _parse_circle(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Cheie normalizată: valorile parsate, nu query string-ul brut. Versiunea face parte din
+        # cheie: un corp randat la altă versiune (scriere din alt proces, citire înainte de
+        # invalidare) nu poate fi servit cu ETag-ul versiunii curente
+        cache_key = ('alerts', version, tuple(sorted(filters.items())), limit, request.args.get('cursor'), columnar)
+        body = response_cache.get(cache_key)
+        if body is None:
+            generation = response_cache.generation
+            alerts, next_cursor = _query_alerts(filters, limit, cursor)
+            if columnar:
+                body = dumps({**alert_columns(alerts), 'next_cursor': next_cursor})
+            else:
+                body = dumps({'alerts': alert_dicts(alerts), 'next_cursor': next_cursor})
+            response_cache.set(cache_key, body, filters, generation)
+
+        return _alert_list(body, etag, columnar)
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to get alerts: ' + str(e)}), 500
+
+def _query_alerts(filters, limit, cursor):
+    """One page of alert rows (column tuples, see serialize.py) and the next cursor."""
+    # Duplicatele legate (DEDUP_MODE='link') apar doar prin alerta canonică
+    stmt = alert_select().where(Alert.canonical_id.is_(None))
+
+    if filters['status']:
+        stmt = stmt.where(Alert.status == filters['status'])
+    if filters['type']:
+        stmt = stmt.where(Alert.type == filters['type'])
+    if filters['bbox']:
+        stmt = stmt.where(bbox_filter(filters['bbox']))
+
+    if not filters['circle']:
+        return paginate_select(db.session, stmt, Alert, limit, cursor)
+
+    # Index gives the circle's bounding box; keep only rows within the exact radius
+    lat, lng, radius_km = filters['circle']
+    stmt = stmt.where(bbox_filter(radius_bbox(lat, lng, radius_km)))
+    if cursor:
+        stmt = stmt.where(keyset_filter(Alert, cursor))
+    matches = []
+    for alert in db.session.execute(stmt.order_by(*keyset_order(Alert)).execution_options(yield_per=200)):
+        if haversine_km(lat, lng, alert.latitude, alert.longitude) <= radius_km:
+            matches.append(alert)
+            if len(matches) > limit:
+                break
+    return split_page(matches, limit)
+
+@main_bp.route('/alerts/search', methods=['GET'])
+def search_alerts():
+    try:
+        terms = search_terms(request.args.get('q', ''))
+        if not terms:
+            return jsonify({'error': 'q must contain at least one word'}), 400
+
+        limit = request.args.get('limit', 20, type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if not 1 <= limit <= 100 or offset < 0:
+            return jsonify({'error': 'limit must be between 1 and 100 and offset non-negative'}), 400
+
+        filters = {
+            'status': request.args.get('status') or None,
+            'type': request.args.get('type') or None,
+            'bbox': None
+        }
+        if request.args.get('bbox'):
+            try:
+                filters['bbox'] = parse_bbox(request.args['bbox'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+        cache_key = ('search', tuple(terms), tuple(sorted(filters.items())), limit, offset)
+        body = response_cache.get(cache_key)
+        if body is None:
+            generation = response_cache.generation
+            stmt = search_statement(terms).where(Alert.canonical_id.is_(None))
+            if filters['status']:
+                stmt = stmt.where(Alert.status == filters['status'])
+            if filters['type']:
+                stmt = stmt.where(Alert.type == filters['type'])
+            if filters['bbox']:
+                stmt = stmt.where(bbox_filter(filters['bbox']))
+
+            # Ranked results page by offset; one extra row tells us if there is a next page
+            rows = db.session.execute(stmt.limit(limit + 1).offset(offset)).all()
+            alerts = alert_dicts(rows[:limit])
+            for alert, row in zip(alerts, rows):
+                alert['score'] = row.score
+            body = dumps({'alerts': alerts, 'next_offset': offset + limit if len(rows) > limit else None})
+            response_cache.set(cache_key, body, filters, generation)
+
+        return _cached_json(body)
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to search alerts: ' + str(e)}), 500
+
+@main_bp.route('/alerts/stats', methods=['GET'])
+def get_alert_stats():
+    try:
+        etag = make_etag(current_version())
+        if not_modified(etag):
+            return _not_modified(etag)
+
+        days = request.args.get('days', 30, type=int)
+        if not 1 <= days <= 366:
+            return jsonify({'error': 'days must be between 1 and 366'}), 400
+
+        # Citire din tabela de rollup, nu GROUP BY peste toate alertele
+        return _with_etag(alert_stats(days), etag)
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to get alert stats: ' + str(e)}), 500
+
+@main_bp.route('/alerts/clusters', methods=['GET'])
+def get_alert_clusters():
+    try:
+        zoom = request.args.get('zoom', type=int)
+        if zoom is None or not 0 <= zoom <= MAX_ZOOM:
+            return jsonify({'error': f'zoom must be an integer between 0 and {MAX_ZOOM}'}), 400
+
+        bbox = None
+        if request.args.get('bbox'):
+            try:
+                bbox = parse_bbox(request.args['bbox'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+        clusters = cluster_index.clusters(zoom, bbox)
+        return jsonify({
+            'zoom': zoom,
+            'clusters': clusters,
+            'total': sum(c['count'] for c in clusters)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to get alert clusters: ' + str(e)}), 500
+
+@main_bp.route('/alerts/heatmap', methods=['GET'])
+def get_alert_heatmap():
+    try:
+        resolution = request.args.get('resolution', 256, type=int)
+        if not 1 <= resolution <= MAX_HEATMAP_RESOLUTION:
+            return jsonify({'error': f'resolution must be between 1 and {MAX_HEATMAP_RESOLUTION}'}), 400
+
         alert_type = request.args.get('type')
-        limit = request.args.get('limit', 50, type=int)
-        
-        query = Alert.query
-        
-        if status:
-            query = query.filter_by(status=status)
-        if alert_type:
-            query = query.filter_by(type=alert_type)
-            
-        alerts = query.order_by(Alert.created_at.desc()).limit(limit).all()
-        
+        if alert_type and alert_type not in ALERT_TYPES:
+            return jsonify({'error': f'Invalid alert type. Must be one of: {", ".join(ALERT_TYPES)}'}), 400
+
+        half_life = request.args.get('half_life_hours', type=float)
+        if half_life is not None and half_life <= 0:
+            return jsonify({'error': 'half_life_hours must be positive'}), 400
+
+        try:
+            bbox = parse_bbox(request.args['bbox']) if request.args.get('bbox') else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        grid = heatmap_grid(
+            alert_snapshot.view(),
+            bbox=bbox,
+            resolution=resolution,
+            type_code=TYPE_LABELS.index(alert_type) if alert_type else None,
+            half_life_hours=half_life
+        )
+
+        if request.args.get('format') == 'png':
+            return Response(encode_png(grid), mimetype='image/png')
+
         return jsonify({
-            'alerts': [alert.to_dict() for alert in alerts]
+            'bbox': list(bbox) if bbox else [-180.0, -90.0, 180.0, 90.0],
+            'width': resolution,
+            'height': resolution,
+            **encode_uint16(grid)
         }), 200
-        
+
     except Exception as e:
-        return jsonify({'error': 'Failed to get alerts: ' + str(e)}), 500
+        return jsonify({'error': 'Failed to build heatmap: ' + str(e)}), 500
+
+@main_bp.route('/alerts/stream', methods=['GET'])
+def stream_alerts():
+    # EventSource trimite Last-Event-ID la reconectare; îl acceptăm și ca query param
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    subscription = broker.subscribe(last_event_id)
+
+    if subscription is None:
+        return jsonify({'error': 'Too many stream subscribers, fall back to polling'}), 503
+
+    return Response(
+        broker.stream(subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @main_bp.route('/alerts/<int:alert_id>', methods=['GET'])
 def get_alert(alert_id):
     try:
-        alert = Alert.query.get(alert_id)
-        
-        if not alert:
-            return jsonify({'error': 'Alert not found'}), 404
-            
-        return jsonify({'alert': alert.to_dict()}), 200
+        cache_key = ('alert', alert_id)
+        body = response_cache.get(cache_key)
+        if body is None:
+            generation = response_cache.generation
+            alert = Alert.query.get(alert_id)
+
+            if not alert:
+                return jsonify({'error': 'Alert not found'}), 404
+
+            body = current_app.json.dumps({'alert': alert.to_dict()}).encode('utf-8')
+            response_cache.set(cache_key, body, {'alert_id': alert_id}, generation)
+
+        return _cached_json(body)
         
     except Exception as e:
         return jsonify({'error': 'Failed to get alert: ' + str(e)}), 500
 
 @main_bp.route('/alerts/<int:alert_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_alert_status(alert_id):
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(int(user_id))
-        
-        if not user or not user.is_admin():
-            return jsonify({'error': 'Admin access required'}), 403
-        
         alert = Alert.query.get(alert_id)
         
         if not alert:
             return jsonify({'error': 'Alert not found'}), 404
         
         data = request.get_json()
-        
+        before = alert_state(alert)
+
         if 'status' in data:
-            valid_statuses = ['pending', 'investigating', 'resolved', 'rejected', 'solved']
-            if data['status'] in valid_statuses:
+            if data['status'] in ALERT_STATUSES:
                 alert.status = data['status']
                 alert.updated_at = datetime.utcnow()
             else:
-                return jsonify({'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
+                return jsonify({'error': f'Invalid status. Must be one of: {", ".join(ALERT_STATUSES)}'}), 400
         
         db.session.commit()
-        
+        _alert_changed('updated', alert, before)
+
         return jsonify({
             'message': 'Alert updated successfully',
             'alert': alert.to_dict()
@@ -318,25 +749,29 @@ def update_alert_status(alert_id):
         return jsonify({'error': 'Failed to update alert: ' + str(e)}), 500
 
 @main_bp.route('/alerts/user', methods=['GET'])
-@jwt_required()
+@user_required
 def get_user_alerts():
     try:
-        user_id = int(get_jwt_identity())
-        
-        alerts = Alert.query.filter_by(user_id=user_id).order_by(Alert.created_at.desc()).all()
-        
-        return jsonify({
-            'alerts': [alert.to_dict() for alert in alerts]
-        }), 200
+        user_id = current_identity().id
+
+        try:
+            limit, cursor = page_args(request.args, 100, 500)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        alerts, next_cursor = paginate_select(db.session, alert_select().where(Alert.user_id == user_id),
+                                              Alert, limit, cursor)
+
+        return _cached_json(dumps({'alerts': alert_dicts(alerts), 'next_cursor': next_cursor}))
         
     except Exception as e:
         return jsonify({'error': 'Failed to get user alerts: ' + str(e)}), 500
 
 @main_bp.route('/alerts/<int:alert_id>/dismiss', methods=['PUT'])
-@jwt_required()
+@user_required
 def dismiss_alert(alert_id):
     try:
-        user_id = int(get_jwt_identity())
+        user_id = current_identity().id
         
         alert = Alert.query.get(alert_id)
         
@@ -348,10 +783,12 @@ def dismiss_alert(alert_id):
             return jsonify({'error': 'You can only dismiss your own alerts'}), 403
         
         # Mark alert as solved
+        before = alert_state(alert)
         alert.status = 'solved'
         alert.updated_at = datetime.utcnow()
         db.session.commit()
-        
+        _alert_changed('dismissed', alert, before)
+
         return jsonify({
             'message': 'Alert marked as solved',
             'alert': alert.to_dict()
@@ -363,41 +800,276 @@ def dismiss_alert(alert_id):
 
 # Admin routes
 @main_bp.route('/admin/users', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_all_users():
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(int(user_id))
-        
-        if not current_user or not current_user.is_admin():
-            return jsonify({'error': 'Admin access required'}), 403
-        
-        users = User.query.all()
+        try:
+            limit, cursor = page_args(request.args, 100, 1000)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        users, next_cursor = paginate(User.query, User, limit, cursor)
         return jsonify({
-            'users': [user.to_dict() for user in users]
+            'users': [user.to_dict() for user in users],
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to get users: ' + str(e)}), 500
 
 @main_bp.route('/admin/alerts', methods=['GET'])
-@jwt_required()
+@admin_required
 def admin_get_alerts():
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(int(user_id))
-        
-        if not current_user or not current_user.is_admin():
-            return jsonify({'error': 'Admin access required'}), 403
-        
-        alerts = Alert.query.order_by(Alert.created_at.desc()).all()
+        columnar = wants_columnar(request)
+        # Citită înaintea interogării (fără cache aici): corpul e cel mult mai nou decât ETag-ul,
+        # deci următorul poll primește 200, niciodată un 304 peste date vechi
+        etag = make_etag(current_version(), 'columnar' if columnar else '')
+        if not_modified(etag):
+            response = _not_modified(etag)
+            response.vary.add('Accept')
+            return response
+
+        try:
+            if 'updated_since' in request.args:
+                return _with_etag(alert_delta(parse_since(request.args['updated_since'])), etag)
+            limit, cursor = page_args(request.args, 100, 1000)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        alerts, next_cursor = paginate_select(db.session, alert_select(), Alert, limit, cursor)
+
+        if columnar:
+            return _alert_list(dumps({**alert_columns(alerts), 'next_cursor': next_cursor}), etag, True)
+        return _alert_list(dumps({'alerts': alert_dicts(alerts), 'next_cursor': next_cursor}), etag, False)
         
+    except Exception as e:
+        return jsonify({'error': 'Failed to get alerts: ' + str(e)}), 500
+
+def _bulk_selection(data):
+    """WHERE clause for a bulk moderation body: {'ids': [...]} or {'filter': {...}}."""
+    if ('ids' in data) == ('filter' in data):
+        raise ValueError('Provide either ids or filter')
+
+    if 'ids' in data:
+        ids = data['ids']
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise ValueError('ids must be a non-empty list of integers')
+        return Alert.id.in_(set(ids))
+
+    spec = data['filter']
+    allowed = {'status', 'type', 'bbox', 'created_after', 'created_before'}
+    if not isinstance(spec, dict) or not spec or set(spec) - allowed:
+        raise ValueError(f'filter must be a non-empty object with keys from: {", ".join(sorted(allowed))}')
+
+    conditions = []
+    if 'status' in spec:
+        if spec['status'] not in ALERT_STATUSES:
+            raise ValueError(f'Invalid filter status. Must be one of: {", ".join(ALERT_STATUSES)}')
+        conditions.append(Alert.status == spec['status'])
+    if 'type' in spec:
+        if spec['type'] not in ALERT_TYPES:
+            raise ValueError(f'Invalid filter type. Must be one of: {", ".join(ALERT_TYPES)}')
+        conditions.append(Alert.type == spec['type'])
+    if 'bbox' in spec:
+        bbox = spec['bbox']
+        conditions.append(bbox_filter(parse_bbox(','.join(map(str, bbox)) if isinstance(bbox, list) else bbox)))
+    if 'created_after' in spec:
+        conditions.append(Alert.created_at >= _filter_timestamp(spec, 'created_after'))
+    if 'created_before' in spec:
+        conditions.append(Alert.created_at < _filter_timestamp(spec, 'created_before'))
+    return and_(*conditions)
+
+def _filter_timestamp(spec, name):
+    try:
+        return parse_since(spec[name])
+    except (ValueError, TypeError):
+        raise ValueError(f'filter.{name} must be an ISO-8601 timestamp')
+
+@main_bp.route('/admin/alerts/bulk', methods=['PUT'])
+@admin_required
+def admin_bulk_update_alerts():
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or data.get('status') not in ALERT_STATUSES:
+            return jsonify({'error': f'status is required. Must be one of: {", ".join(ALERT_STATUSES)}'}), 400
+        status = data['status']
+
+        try:
+            selection = _bulk_selection(data)
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Versiunea se incrementează înainte de SELECT: pe SQLite FOR UPDATE nu face nimic,
+        # dar prima scriere ia lock-ul de scriere al bazei, deci rândurile citite mai jos
+        # nu se pot schimba până la commit. Pe PostgreSQL FOR UPDATE blochează rândurile.
+        connection = db.session.connection()
+        bump_version(connection)
+
+        # Stările anterioare: pentru rollup-ul de statistici, cache și evenimente
+        max_rows = current_app.config.get('ALERT_BULK_UPDATE_MAX', 10000)
+        rows = db.session.execute(
+            select(Alert.id, Alert.status, Alert.type, Alert.latitude, Alert.longitude, Alert.created_at,
+                   Alert.canonical_id)
+            .where(selection, Alert.status != status)
+            .order_by(Alert.id)
+            .limit(max_rows + 1)
+            .with_for_update()
+        ).all()
+        if len(rows) > max_rows:
+            db.session.rollback()
+            return jsonify({'error': f'Filter matches more than {max_rows} alerts, narrow it down'}), 413
+
+        ids = [row.id for row in rows]
+        if not ids:
+            # Nimic de schimbat: rollback anulează și incrementarea versiunii
+            db.session.rollback()
+            return jsonify({'message': f'0 alert(s) set to {status}', 'updated': 0, 'status': status, 'ids': []}), 200
+
+        # Un singur UPDATE set-based; ocolește ORM-ul, deci rollup-ul se actualizează explicit
+        connection.execute(
+            update(Alert).where(Alert.id.in_(ids)).values(status=status, updated_at=datetime.utcnow())
+        )
+        deltas = Counter()
+        for row in rows:
+            # Duplicatele legate nu intră în statistici
+            if row.canonical_id is not None:
+                continue
+            deltas[('status', row.status)] -= 1
+            deltas[('status', status)] += 1
+        apply_deltas(connection, deltas)
+        db.session.commit()
+
+        _alerts_updated_bulk([{'id': r.id, 'status': r.status, 'type': r.type,
+                               'latitude': r.latitude, 'longitude': r.longitude} for r in rows], status)
+
         return jsonify({
-            'alerts': [alert.to_dict() for alert in alerts]
+            'message': f'{len(ids)} alert(s) set to {status}',
+            'updated': len(ids),
+            'status': status,
+            'ids': ids
         }), 200
-        
+
     except Exception as e:
-        return jsonify({'error': 'Failed to get alerts: ' + str(e)}), 500
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update alerts: ' + str(e)}), 500
+
+@main_bp.route('/admin/alerts/export', methods=['GET'])
+@admin_required
+def admin_export_alerts():
+    try:
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'error': f'Invalid format. Must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+
+        filters = {'status': request.args.get('status'), 'type': request.args.get('type')}
+        mimetype, extension = EXPORT_FORMATS[fmt]
+        filename = f'alerts-{datetime.utcnow():%Y%m%d-%H%M%S}.{extension}'
+    except Exception as e:
+        return jsonify({'error': 'Failed to export alerts: ' + str(e)}), 500
+
+    # Răspunsul e generat pe bucăți: memoria rămâne constantă indiferent de mărimea tabelei
+    return Response(
+        stream_with_context(export_stream(fmt, filters)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}', 'X-Accel-Buffering': 'no'}
+    )
+
+@main_bp.route('/admin/cache/stats', methods=['GET'])
+@admin_required
+def admin_cache_stats():
+    return jsonify({
+        'cache': response_cache.stats(),
+        'identity': identity_cache.stats(),
+        'hashing': password_hasher.stats(),
+        'compression': compressor.stats(),
+        'monitoring': monitoring_worker.stats(),
+        'stream': broker.stats()
+    }), 200
+
+@main_bp.route('/admin/sql-profile', methods=['GET', 'DELETE'])
+@admin_required
+def admin_sql_profile():
+    if request.method == 'DELETE':
+        sql_profiler.reset()
+        return jsonify({'message': 'SQL profile reset'}), 200
+    return jsonify({
+        'enabled': sql_profiler.enabled,
+        'profile_all': sql_profiler.profile_all,
+        'repeat_threshold': sql_profiler.repeat_threshold,
+        'endpoints': sql_profiler.report()
+    }), 200
+
+@main_bp.route('/admin/monitoring/jobs', methods=['POST'])
+@admin_required
+def create_monitoring_jobs():
+    """One job object, or a list of them to enqueue many AOIs at once."""
+    try:
+        data = request.get_json(silent=True)
+        specs = data if isinstance(data, list) else [data]
+        if not specs:
+            return jsonify({'error': 'No jobs provided'}), 400
+        max_jobs = current_app.config.get('MONITORING_BATCH_MAX', 1000)
+        if len(specs) > max_jobs:
+            return jsonify({'error': f'Too many jobs in one request (max {max_jobs})'}), 413
+
+        rows = []
+        for index, spec in enumerate(specs):
+            try:
+                rows.append(parse_job_spec(spec))
+            except ValueError as e:
+                message = f'Job {index}: {e}' if isinstance(data, list) else str(e)
+                return jsonify({'error': message}), 400
+
+        created_by = current_identity().id
+        jobs = [MonitoringJob(**row, created_by=created_by) for row in rows]
+        db.session.add_all(jobs)
+        db.session.commit()
+        monitoring_worker.wake()
+
+        if isinstance(data, list):
+            return jsonify({'jobs': [job.to_dict() for job in jobs]}), 201
+        return jsonify({'job': jobs[0].to_dict()}), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to create monitoring jobs: ' + str(e)}), 500
+
+@main_bp.route('/admin/monitoring/jobs', methods=['GET'])
+@admin_required
+def get_monitoring_jobs():
+    try:
+        status = request.args.get('status') or None
+        if status and status not in JOB_STATUSES:
+            return jsonify({'error': f'Invalid status. Must be one of: {", ".join(JOB_STATUSES)}'}), 400
+        try:
+            limit, cursor = page_args(request.args, 100, 1000)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        query = MonitoringJob.query
+        if status:
+            query = query.filter(MonitoringJob.status == status)
+        jobs, next_cursor = paginate(query, MonitoringJob, limit, cursor)
+        return jsonify({
+            'jobs': [job.to_dict() for job in jobs],
+            'next_cursor': next_cursor
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to get monitoring jobs: ' + str(e)}), 500
+
+@main_bp.route('/admin/monitoring/jobs/<int:job_id>', methods=['GET'])
+@admin_required
+def get_monitoring_job(job_id):
+    try:
+        job = db.session.get(MonitoringJob, job_id)
+        if not job:
+            return jsonify({'error': 'Monitoring job not found'}), 404
+        return jsonify({'job': job.to_dict()}), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to get monitoring job: ' + str(e)}), 500
 
 @auth_bp.route('/upgrade-to-admin', methods=['POST'])
 @jwt_required()
@@ -426,9 +1098,10 @@ def upgrade_to_admin():
         # Upgrade user to admin
         current_user.role = 'admin'
         db.session.commit()
-        
-        # Create new token with admin privileges
-        new_token = create_access_token(identity=str(current_user.id))
+        identity_cache.invalidate(current_user.id)
+
+        # Create new token with admin privileges (also re-caches the new role)
+        new_token = issue_token(current_user)
         
         return jsonify({
             'message': 'Successfully upgraded to admin!',
@@ -445,10 +1118,9 @@ def test():
     return {'message': 'Backend connected successfully!'}
 
 @main_bp.route('/protected')
-@jwt_required()
+@user_required
 def protected():
-    user_id = get_jwt_identity()
-    user = User.query.get(int(user_id))
+    user = current_identity()
     return jsonify({
         'message': f'Hello {user.name}! This is a protected route.',
         'user_role': user.role
@@ -1,25 +1,69 @@
 # backend/run.py
+import os
+import sys
+
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 
-def create_app():
+from config import database_config, engine_options, install_sqlite_pragmas
+
+def create_app(test_config=None):
     app = Flask(__name__)
     
     # Configuration
     app.config['SECRET_KEY'] = 'dev-environmental-monitoring-secret-key-2024'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+    # Baza de date: SQLite (WAL + pragmas) implicit, sau DATABASE_URL (ex. PostgreSQL)
+    app.config.update(database_config())
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = 'jwt-environmental-alerts-secret-2024'
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False
+    # Cost bcrypt + pool-ul de hashing (peste BCRYPT_MAX_PENDING cereri -> 503)
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    app.config['BCRYPT_WORKERS'] = int(os.environ.get('BCRYPT_WORKERS', min(4, os.cpu_count() or 1)))
+    app.config['BCRYPT_MAX_PENDING'] = int(os.environ.get('BCRYPT_MAX_PENDING', 32))
+    # Rapoarte duplicate: 'merge' (crește report_count) sau 'link' (rând nou cu canonical_id)
+    app.config['DEDUP_ENABLED'] = os.environ.get('DEDUP_ENABLED', '1') != '0'
+    app.config['DEDUP_RADIUS_M'] = float(os.environ.get('DEDUP_RADIUS_M', 250))
+    app.config['DEDUP_WINDOW_MINUTES'] = float(os.environ.get('DEDUP_WINDOW_MINUTES', 30))
+    app.config['DEDUP_MODE'] = os.environ.get('DEDUP_MODE', 'merge')
+    # Profilare SQL: SQL_PROFILE=1 pentru toate cererile, altfel doar cu header-ul X-SQL-Profile (în debug)
+    app.config['SQL_PROFILE_ALL'] = os.environ.get('SQL_PROFILE') == '1'
+    if 'SQL_PROFILE_HEADER' in os.environ:
+        app.config['SQL_PROFILE_HEADER'] = os.environ['SQL_PROFILE_HEADER'] == '1'
+    # Compresie gzip/brotli (brotli doar dacă pachetul e instalat) pentru răspunsuri peste COMPRESS_MIN_SIZE
+    app.config['COMPRESS_ENABLED'] = os.environ.get('COMPRESS_ENABLED', '1') != '0'
+    app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    # Joburi de monitorizare NDVI (POST /api/admin/monitoring/jobs); worker-ul pornește doar din
+    # serverul propriu-zis (python run.py) sau din `flask --app run monitoring-worker`, nu din create_app
+    app.config['MONITORING_ENABLED'] = os.environ.get('MONITORING_ENABLED', '1') != '0'
+    app.config['MONITORING_WORKERS'] = int(os.environ.get('MONITORING_WORKERS', 2))
+    app.config['MONITORING_RETRIES'] = int(os.environ.get('MONITORING_RETRIES', 2))
+
+    # Overrides for tests / embedding, e.g. {'SQLALCHEMY_DATABASE_URI': 'sqlite://'}
+    if test_config:
+        app.config.update(test_config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
     
     print("📋 App configuration loaded...")
     
     # Initialize extensions with app
     try:
-        from models import db, bcrypt
+        from models import db, bcrypt, password_hasher
+        from events import broker
+        from cache import response_cache
+        from security import identity_cache
+        from compress import compressor
         db.init_app(app)
+        with app.app_context():
+            install_sqlite_pragmas(db.engine, app.config)
         bcrypt.init_app(app)
+        password_hasher.init_app(app)
+        broker.init_app(app)
+        response_cache.init_app(app)
+        identity_cache.init_app(app)
+        # Înregistrat primul, deci rulează ultimul dintre hook-urile after_request
+        compressor.init_app(app)
         print("✅ Database and bcrypt initialized...")
     except Exception as e:
         print(f"❌ Error initializing database: {e}")
@@ -54,70 +98,61 @@ def create_app():
     except Exception as e:
         print(f"❌ Error importing routes: {e}")
         return None
+
+    # Metrici Prometheus pe /metrics (hook-uri before/after_request + evenimente SQL)
+    try:
+        from metrics import metrics
+        from profiling import sql_profiler
+        with app.app_context():
+            metrics.init_app(app, db.engine)
+            sql_profiler.init_app(app, db.engine)
+        print("✅ Metrics exposed on /metrics...")
+        if sql_profiler.enabled:
+            print("🔍 SQL profiling enabled (X-SQL-* response headers)...")
+    except Exception as e:
+        print(f"❌ Error initializing metrics: {e}")
+        return None
     
-    # Create tables and users
+    # Migrări de schemă (fără drop_all): pe o bază deja la zi e doar un SELECT
     with app.app_context():
         try:
-            from models import User
-            
-            print("🔄 Setting up database...")
-            
-            # Șterge și recreează tabelele pentru a fi sigur
-            db.drop_all()
-            db.create_all()
-            print("✅ Database tables created...")
-            
-            # Verifică dacă utilizatorii există deja
-            existing_admin = User.query.filter_by(email='viewer2413q@gmail.com').first()
-            existing_admin2 = User.query.filter_by(email='admin@treelives.com').first()
-            existing_user = User.query.filter_by(email='andreea2.p.3@gmail.com').first()
-            
-            if not existing_admin:
-                # Creează admin
-                admin_user = User(
-                    name='Administrator',
-                    email='viewer2413q@gmail.com',
-                    password='admin123',
-                    role='admin'
-                )
-                db.session.add(admin_user)
-                print("✅ Admin user prepared...")
-            
-            if not existing_user:
-                # Creează user de test
-                test_user = User(
-                    name='Andreea Test',
-                    email='andreea2.p.3@gmail.com',
-                    password='admin123',
-                    role='user'
-                )
-                db.session.add(test_user)
-                print("✅ Test user prepared...")
-            
-            if not existing_admin2:
-                # Creează admin alternativ pentru demo/login
-                admin_user2 = User(
-                    name='Admin',
-                    email='admin@treelives.com',
-                    password='admin123',
-                    role='admin'
-                )
-                db.session.add(admin_user2)
-                print("✅ Secondary admin user prepared (admin@treelives.com)...")
-            
-            db.session.commit()
-            print("✅ Users created successfully!")
-            
-            # Verifică că utilizatorii s-au creat
-            users = User.query.all()
-            print(f"📊 Total users in database: {len(users)}")
-            for user in users:
-                print(f"   👤 {user.email} - {user.role}")
-                
+            from migrations import upgrade
+            applied = upgrade(db.engine)
+            for name in applied:
+                print(f"✅ Migration applied: {name}")
+            print("✅ Database schema up to date...")
         except Exception as e:
-            print(f"❌ Error creating users: {e}")
-            db.session.rollback()
-    
+            print(f"❌ Error migrating database: {e}")
+            return None
+
+    # Doar configurare: thread-urile pornesc din start_monitoring_worker()
+    try:
+        from monitoring import monitoring_worker
+        monitoring_worker.init_app(app)
+    except Exception as e:
+        print(f"❌ Error configuring monitoring worker: {e}")
+        return None
+
+    # CLI: flask --app run db-upgrade / flask --app run seed
+    @app.cli.command('db-upgrade')
+    def db_upgrade_command():
+        from migrations import upgrade
+        applied = upgrade(db.engine)
+        print(f"Applied {len(applied)} migration(s): {', '.join(applied) or '-'}")
+
+    @app.cli.command('monitoring-worker')
+    def monitoring_worker_command():
+        """Run monitoring jobs in the foreground (for deployments behind a WSGI server)."""
+        from monitoring import monitoring_worker
+        print(f"Monitoring worker running ({monitoring_worker.workers} worker(s)), Ctrl+C to stop")
+        monitoring_worker.run_forever()
+
+    @app.cli.command('seed')
+    def seed_command():
+        from migrations import seed_demo_users
+        created = seed_demo_users()
+        print(f"Created {len(created)} demo user(s): {', '.join(created) or '-'}")
+
     # Error handlers pentru debugging
     @app.errorhandler(404)
     def not_found(error):
@@ -129,16 +164,37 @@ def create_app():
     
     return app
 
+def start_monitoring_worker(use_reloader=False):
+    """Start the background job worker in the process that actually serves requests."""
+    from monitoring import monitoring_worker
+    if not monitoring_worker.enabled:
+        return
+    # Cu reloader-ul din debug, procesul părinte doar supraveghează copilul (WERKZEUG_RUN_MAIN)
+    if use_reloader and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    monitoring_worker.start()
+    print(f"✅ Monitoring worker started ({monitoring_worker.workers} worker(s))...")
+
 if __name__ == '__main__':
     print("\n" + "="*50)
     print("🚀 STARTING ENVIRONMENTAL MONITORING BACKEND")
     print("="*50)
     
+    # Serverul pornește cu debug=True, dar app.debug devine True abia în app.run(), după
+    # create_app: header-ul X-SQL-Profile se activează explicit (SQL_PROFILE_HEADER=0 îl oprește)
+    os.environ.setdefault('SQL_PROFILE_HEADER', '1')
     app = create_app()
     
     if app is None:
         print("❌ Failed to create Flask app! Check your imports and dependencies.")
         exit(1)
+
+    # Conturile demo se creează doar la cerere: python run.py --seed
+    if '--seed' in sys.argv:
+        from migrations import seed_demo_users
+        with app.app_context():
+            for email in seed_demo_users():
+                print(f"   👤 Demo user created: {email}")
     
     print("\n📍 Server Information:")
     print("   🌐 URL: http://localhost:5000")
@@ -157,6 +213,7 @@ if __name__ == '__main__':
     print("="*50 + "\n")
     
     try:
+        start_monitoring_worker(use_reloader=True)
         app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
     except Exception as e:
         print(f"❌ Failed to start server: {e}")
@@ -0,0 +1,120 @@
+# backend/search.py
+# Full-text search over alert titles and descriptions: an SQLite FTS5 index
+# kept in sync by triggers, or a generated tsvector column on PostgreSQL.
+import re
+import sqlite3
+
+from sqlalchemy import and_, column, func, literal_column, or_, table, text
+
+from models import Alert
+from serialize import alert_select
+
+# Set by install/detect_search_index(): 'fts5', 'tsvector' or None (LIKE fallback)
+_search_backend = None
+
+alerts_fts = table('alerts_fts', column('rowid'), column('rank'))
+
+_FTS5_DDL = [
+    # External content table: the text lives only in alerts, FTS5 stores the index
+    "CREATE VIRTUAL TABLE IF NOT EXISTS alerts_fts USING fts5("
+    "title, description, content='alerts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    """CREATE TRIGGER IF NOT EXISTS alerts_fts_ai AFTER INSERT ON alerts BEGIN
+        INSERT INTO alerts_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS alerts_fts_ad AFTER DELETE ON alerts BEGIN
+        INSERT INTO alerts_fts (alerts_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS alerts_fts_au AFTER UPDATE OF title, description ON alerts BEGIN
+        INSERT INTO alerts_fts (alerts_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO alerts_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    # Default ranking: bm25 with title matches weighted 10x description matches
+    "INSERT INTO alerts_fts (alerts_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+]
+
+_TSVECTOR_DDL = [
+    "ALTER TABLE alerts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_alerts_search_vector ON alerts USING gin (search_vector)",
+]
+
+
+def _fts5_available():
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE temp.probe USING fts5(a)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def install_search_index(conn):
+    """Create the full-text index for this dialect. Returns the backend name or None."""
+    global _search_backend
+    if conn.dialect.name == 'postgresql':
+        for statement in _TSVECTOR_DDL:
+            conn.execute(text(statement))
+        _search_backend = 'tsvector'
+        return _search_backend
+
+    if conn.dialect.name != 'sqlite' or not _fts5_available():
+        print("⚠️ FTS5 not available, text search falls back to LIKE")
+        _search_backend = None
+        return None
+
+    for statement in _FTS5_DDL:
+        conn.execute(text(statement))
+    # 'rebuild' re-reads every row from alerts; covers rows written before the triggers existed
+    conn.execute(text("INSERT INTO alerts_fts (alerts_fts) VALUES ('rebuild')"))
+    _search_backend = 'fts5'
+    return _search_backend
+
+
+def detect_search_index(conn):
+    """Pick the search backend a migration already installed."""
+    global _search_backend
+    if conn.dialect.name == 'postgresql':
+        found = conn.execute(text(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = 'alerts' AND column_name = 'search_vector'"
+        )).first()
+        _search_backend = 'tsvector' if found else None
+    elif conn.dialect.name == 'sqlite':
+        found = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'alerts_fts'")).first()
+        _search_backend = 'fts5' if found else None
+    else:
+        _search_backend = None
+    return _search_backend
+
+
+def search_terms(q):
+    """Words of the user's query; punctuation is dropped so input can't break MATCH syntax."""
+    return re.findall(r'\w+', q.lower())[:10]
+
+
+def search_statement(terms):
+    """alert_select() columns plus score for rows matching every term, best matches first.
+
+    The last term is matched as a prefix, so results follow the user as they type.
+    """
+    if _search_backend == 'fts5':
+        match = ' '.join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+        return (alert_select((-alerts_fts.c.rank).label('score'))
+                .join(alerts_fts, alerts_fts.c.rowid == Alert.id)
+                .where(literal_column('alerts_fts').op('MATCH')(match.strip()))
+                .order_by(alerts_fts.c.rank, Alert.id.desc()))
+
+    if _search_backend == 'tsvector':
+        query = func.to_tsquery('simple', ' & '.join(terms[:-1] + [terms[-1] + ':*']))
+        vector = literal_column('alerts.search_vector')
+        score = func.ts_rank_cd(vector, query)
+        return (alert_select(score.label('score'))
+                .where(vector.op('@@')(query))
+                .order_by(score.desc(), Alert.id.desc()))
+
+    # No index: substring match, newest first (full scan, fine for small tables)
+    conditions = [or_(Alert.title.ilike(f'%{t}%'), Alert.description.ilike(f'%{t}%')) for t in terms]
+    return (alert_select(literal_column('0.0').label('score'))
+            .where(and_(*conditions))
+            .order_by(Alert.created_at.desc(), Alert.id.desc()))
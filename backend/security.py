@@ -0,0 +1,121 @@
+# backend/security.py
+# Token issuing, a TTL/LRU identity cache and the user_required /
+# admin_required decorators used by the routes. Tokens carry only the user id:
+# role and active flag are read from the cache on every request, so a role
+# change or deactivation applies to tokens that were already issued.
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from flask import g, jsonify
+from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
+from sqlalchemy import select
+
+from models import db, User
+
+Identity = namedtuple('Identity', 'id name role is_active')
+
+
+class IdentityCache:
+    """user id -> Identity, bounded in size and age.
+
+    Authorization reads from here, so a warm cache costs no SQL. Writes that change
+    a user's role or profile must call invalidate(); the TTL bounds how long other
+    worker processes keep serving the old values.
+    """
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('IDENTITY_CACHE_MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', self.ttl)
+
+    def get(self, user_id):
+        with self._lock:
+            item = self._entries.get(user_id)
+            if item is None or item[1] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return item[0]
+
+    def set(self, identity):
+        with self._lock:
+            self._entries[identity.id] = (identity, time.monotonic() + self.ttl)
+            self._entries.move_to_end(identity.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
+
+
+identity_cache = IdentityCache()
+
+
+def load_identity(user_id):
+    identity = identity_cache.get(user_id)
+    if identity is None:
+        row = db.session.execute(
+            select(User.id, User.name, User.role, User.is_active).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        identity = Identity(row.id, row.name, row.role, bool(row.is_active))
+        identity_cache.set(identity)
+    return identity
+
+
+def remember(user):
+    """Refresh the cache from an ORM user that was just loaded or changed."""
+    identity_cache.set(Identity(user.id, user.name, user.role, bool(user.is_active)))
+
+
+def issue_token(user):
+    """Access token for the user; also warms the identity cache for its first request."""
+    remember(user)
+    return create_access_token(identity=str(user.id))
+
+
+def current_identity():
+    return g.get('identity')
+
+
+def _require(roles, forbidden_message):
+    def decorator(fn):
+        @wraps(fn)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            identity = load_identity(int(get_jwt_identity()))
+            if identity is None:
+                return jsonify({'error': 'User not found'}), 404
+            if not identity.is_active:
+                return jsonify({'error': 'Account is deactivated'}), 403
+            if identity.role not in roles:
+                return jsonify({'error': forbidden_message}), 403
+            g.identity = identity
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+user_required = _require(('user', 'admin'), 'Only authenticated users can perform this action')
+admin_required = _require(('admin',), 'Admin access required')
@@ -0,0 +1,111 @@
+# backend/serialize.py
+# Fast path for alert listings: column-only selects (no ORM hydration) and one
+# reusable JSON encoder; orjson is used when it is installed.
+import json
+from datetime import timezone
+from functools import lru_cache
+
+from sqlalchemy import select
+
+from models import Alert, ALERT_TYPES, ALERT_STATUSES
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+# Same keys and order as Alert.to_dict()
+ALERT_COLUMNS = (
+    Alert.id, Alert.title, Alert.description, Alert.type, Alert.latitude, Alert.longitude,
+    Alert.accuracy, Alert.status, Alert.user_id, Alert.report_count, Alert.canonical_id,
+    Alert.created_at, Alert.updated_at
+)
+ALERT_FIELDS = tuple(column.key for column in ALERT_COLUMNS)
+_TIMESTAMP_POSITIONS = tuple(i for i, name in enumerate(ALERT_FIELDS) if name in ('created_at', 'updated_at'))
+
+# Coduri numerice pentru type/status; valorile necunoscute primesc ultimul cod
+TYPE_LABELS = ALERT_TYPES + ['unknown']
+STATUS_LABELS = ALERT_STATUSES + ['unknown']
+_TYPE_CODES = {name: i for i, name in enumerate(ALERT_TYPES)}
+_STATUS_CODES = {name: i for i, name in enumerate(ALERT_STATUSES)}
+
+COLUMNAR_MIMETYPE = 'application/vnd.treelives.columnar+json'
+
+# Built once: no per-call encoder construction, no key sorting, no circular checks
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), check_circular=False)
+
+
+def alert_select(*extra):
+    """select() of the to_dict() columns (plus any extra columns, e.g. a search score)."""
+    return select(*ALERT_COLUMNS, *extra)
+
+
+@lru_cache(maxsize=16384)
+def iso(value):
+    # Rows written together (batch inserts, bulk updates) share timestamps
+    return value.isoformat() if value is not None else None
+
+
+def alert_dicts(rows):
+    """Row tuples from alert_select() -> to_dict()-shaped dicts (extra columns are dropped)."""
+    n = len(ALERT_FIELDS)
+    if orjson is not None:
+        # orjson formats naive datetimes exactly like isoformat()
+        return [dict(zip(ALERT_FIELDS, row[:n])) for row in rows]
+    result = []
+    for row in rows:
+        values = list(row[:n])
+        for i in _TIMESTAMP_POSITIONS:
+            values[i] = iso(values[i])
+        result.append(dict(zip(ALERT_FIELDS, values)))
+    return result
+
+
+def dumps(payload):
+    """JSON-encode a response payload to UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return _encoder.encode(payload).encode('utf-8')
+
+
+def encode_type(value):
+    return _TYPE_CODES.get(value, len(ALERT_TYPES))
+
+
+def encode_status(value):
+    return _STATUS_CODES.get(value, len(ALERT_STATUSES))
+
+
+def _epoch(value):
+    # Timestamps are stored as naive UTC
+    return int(value.replace(tzinfo=timezone.utc).timestamp()) if value is not None else None
+
+
+def alert_columns(rows):
+    """Row tuples from alert_select() -> one array per column instead of one object per row.
+
+    type/status are indexes into the `types`/`statuses` dictionaries and the
+    timestamps are Unix epoch seconds, so key names and repeated strings are
+    sent once per page instead of once per alert.
+    """
+    return {
+        'format': 'columnar',
+        'count': len(rows),
+        'types': TYPE_LABELS,
+        'statuses': STATUS_LABELS,
+        'ids': [row.id for row in rows],
+        'lat': [row.latitude for row in rows],
+        'lng': [row.longitude for row in rows],
+        'type': [encode_type(row.type) for row in rows],
+        'status': [encode_status(row.status) for row in rows],
+        'report_count': [row.report_count for row in rows],
+        'created': [_epoch(row.created_at) for row in rows],
+        'updated': [_epoch(row.updated_at) for row in rows],
+    }
+
+
+def wants_columnar(request):
+    """?format=columnar or an Accept header preferring the columnar media type."""
+    if request.args.get('format') == 'columnar':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', COLUMNAR_MIMETYPE]) == COLUMNAR_MIMETYPE
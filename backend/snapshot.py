@@ -0,0 +1,148 @@
+# backend/snapshot.py
+# In-memory columnar copy of alert coordinates/attributes for map aggregations,
+# refreshed incrementally from the alerts table.
+import threading
+from collections import namedtuple
+from datetime import timedelta, timezone
+
+import numpy as np
+from sqlalchemy import select
+
+from models import db, Alert, AlertTombstone
+from serialize import TYPE_LABELS, STATUS_LABELS, encode_type, encode_status
+from sync import current_version
+
+# Re-read this much before the watermark to catch transactions that committed late
+_OVERLAP = timedelta(seconds=5)
+
+_COLUMNS = ('ids', 'lat', 'lng', 'type_code', 'status_code', 'created', 'alive')
+SnapshotView = namedtuple('SnapshotView', _COLUMNS + ('generation', 'size'))
+
+
+def _make_view(columns, generation):
+    return SnapshotView(generation=generation, size=len(columns['ids']), **columns)
+
+
+def _epoch(value):
+    # Timestamps are stored as naive UTC
+    return value.replace(tzinfo=timezone.utc).timestamp() if value else np.nan
+
+
+def _empty_columns():
+    return {
+        'ids': np.empty(0, dtype=np.int64),
+        'lat': np.empty(0, dtype=np.float64),
+        'lng': np.empty(0, dtype=np.float64),
+        'type_code': np.empty(0, dtype=np.int8),
+        'status_code': np.empty(0, dtype=np.int8),
+        'created': np.empty(0, dtype=np.float64),
+        'alive': np.empty(0, dtype=bool),
+    }
+
+
+class AlertSnapshot:
+    """Columnar arrays of (id, lat, lng, type, status, created_at epoch), sorted by id.
+
+    Arrays are never mutated in place: a refresh builds new ones and swaps them in,
+    so a view handed to a request stays consistent. `generation` changes whenever
+    existing rows change (update/delete, or an insert below the highest id); pure
+    appends only grow `size`, which lets consumers fold in just the appended tail.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._watermark = None
+        self._state = _make_view(_empty_columns(), 0)
+
+    def view(self):
+        """Refresh from the database if the alerts change counter moved, then return a view."""
+        version = current_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._refresh()
+                    self._version = version
+        return self._state
+
+    def reset(self):
+        with self._lock:
+            self._version = None
+            self._watermark = None
+            self._state = _make_view(_empty_columns(), self._state.generation + 1)
+
+    def _refresh(self):
+        # Linked duplicates (DEDUP_MODE=link) are hidden from listings, so they are not
+        # clustered either; canonical_id is only ever set on insert
+        query = (select(Alert.id, Alert.latitude, Alert.longitude, Alert.type, Alert.status,
+                        Alert.created_at, Alert.updated_at)
+                 .where(Alert.canonical_id.is_(None)))
+        deleted = []
+        if self._watermark is not None:
+            since = self._watermark - _OVERLAP
+            query = query.where(Alert.updated_at >= since)
+            deleted = db.session.execute(
+                select(AlertTombstone.alert_id).where(AlertTombstone.deleted_at >= since)
+            ).scalars().all()
+        rows = db.session.execute(query.order_by(Alert.id)).all()
+        if not rows and not deleted:
+            return
+
+        cols = self._state._asdict()
+        ids = np.fromiter((r.id for r in rows), dtype=np.int64, count=len(rows))
+        lat = np.fromiter((r.latitude for r in rows), dtype=np.float64, count=len(rows))
+        lng = np.fromiter((r.longitude for r in rows), dtype=np.float64, count=len(rows))
+        type_code = np.fromiter((encode_type(r.type) for r in rows),
+                                dtype=np.int8, count=len(rows))
+        status_code = np.fromiter((encode_status(r.status) for r in rows),
+                                  dtype=np.int8, count=len(rows))
+        created = np.fromiter((_epoch(r.created_at) for r in rows), dtype=np.float64, count=len(rows))
+
+        # Rows not in the snapshot yet are usually appends (ids above the current maximum),
+        # but PostgreSQL sequences hand out ids out of commit order: a lower id can commit late
+        n = len(cols['ids'])
+        pos = np.searchsorted(cols['ids'], ids)
+        found = (pos < n) & (cols['ids'][np.minimum(pos, n - 1)] == ids) if n else np.zeros(len(ids), dtype=bool)
+        new = ~found
+        changed = False
+        updated = {name: cols[name] for name in _COLUMNS}
+
+        if found.any():
+            sel = np.flatnonzero(found)
+            pos = pos[sel]
+            moved = ((cols['lat'][pos] != lat[sel]) | (cols['lng'][pos] != lng[sel])
+                     | (cols['type_code'][pos] != type_code[sel]) | (cols['status_code'][pos] != status_code[sel]))
+            if moved.any():
+                pos, sel = pos[moved], sel[moved]
+                for name, values in (('lat', lat), ('lng', lng), ('type_code', type_code), ('status_code', status_code)):
+                    updated[name] = updated[name].copy()
+                    updated[name][pos] = values[sel]
+                changed = True
+
+        if deleted:
+            pos = np.searchsorted(cols['ids'], np.asarray(deleted, dtype=np.int64))
+            pos = pos[(pos < len(cols['ids']))]
+            pos = pos[np.isin(cols['ids'][pos], deleted) & cols['alive'][pos]]
+            if len(pos):
+                updated['alive'] = updated['alive'].copy()
+                updated['alive'][pos] = False
+                changed = True
+
+        if new.any():
+            added = {'ids': ids[new], 'lat': lat[new], 'lng': lng[new], 'type_code': type_code[new],
+                     'status_code': status_code[new], 'created': created[new],
+                     'alive': np.ones(int(new.sum()), dtype=bool)}
+            # rows come ordered by id, so the insert positions keep the arrays sorted
+            pos = np.searchsorted(updated['ids'], added['ids'])
+            if (pos < n).any():
+                # Rows inserted in the middle shift positions: consumers must rebuild
+                changed = True
+            updated = {name: np.insert(updated[name], pos, added[name]) for name in updated}
+
+        self._state = _make_view(updated, self._state.generation + 1 if changed else self._state.generation)
+        newest = max((r.updated_at for r in rows if r.updated_at is not None), default=None)
+        if newest is not None:
+            self._watermark = max(self._watermark or newest, newest)
+
+
+alert_snapshot = AlertSnapshot()
@@ -0,0 +1,151 @@
+# backend/stats.py
+# Alert count rollups by status, type, creation day and region, maintained
+# incrementally in the same transaction as the alert writes. Like the listings,
+# they count canonical alerts only: linked duplicates (DEDUP_MODE=link) are left out.
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, insert, inspect, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import db, Alert, AlertStat
+
+DIMENSIONS = ('status', 'type', 'day', 'region')
+# Regions are REGION_DEGREES x REGION_DEGREES cells keyed by their south-west corner
+REGION_DEGREES = 10
+
+_stats = AlertStat.__table__
+
+
+def region_key(latitude, longitude):
+    if latitude is None or longitude is None:
+        return 'unknown'
+    lat0 = int(math.floor(latitude / REGION_DEGREES) * REGION_DEGREES)
+    lng0 = int(math.floor(longitude / REGION_DEGREES) * REGION_DEGREES)
+    return f'{min(lat0, 90 - REGION_DEGREES)},{min(lng0, 180 - REGION_DEGREES)}'
+
+
+def region_bbox(key):
+    """[min_lng, min_lat, max_lng, max_lat] of a region key (same order as ?bbox=)."""
+    lat0, lng0 = (int(v) for v in key.split(','))
+    return [lng0, lat0, lng0 + REGION_DEGREES, lat0 + REGION_DEGREES]
+
+
+def stat_keys(status, alert_type, created_at, latitude, longitude):
+    """The (dimension, key) pairs one alert counts towards."""
+    return [
+        ('status', status or 'unknown'),
+        ('type', alert_type or 'unknown'),
+        ('day', created_at.date().isoformat() if created_at else 'unknown'),
+        ('region', region_key(latitude, longitude)),
+    ]
+
+
+def row_keys(row):
+    """stat_keys for a plain dict of alert columns (batch inserts)."""
+    if row.get('canonical_id') is not None:
+        return []
+    return stat_keys(row.get('status'), row.get('type'), row.get('created_at'),
+                     row.get('latitude'), row.get('longitude'))
+
+
+def apply_deltas(connection, deltas):
+    """Add {(dimension, key): delta} to the rollup inside the caller's transaction."""
+    rows = [{'dimension': d, 'key': k, 'count': n} for (d, k), n in deltas.items() if n]
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(_stats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_stats.c.dimension, _stats.c.key],
+            set_={'count': _stats.c.count + stmt.excluded.count}
+        )
+        connection.execute(stmt, rows)
+        return
+    for row in rows:
+        result = connection.execute(
+            update(_stats)
+            .where(_stats.c.dimension == row['dimension'], _stats.c.key == row['key'])
+            .values(count=_stats.c.count + row['count'])
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(_stats).values(**row))
+
+
+def _previous(state, name):
+    # Value before this flush: history.deleted holds the replaced value, if any
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.obj(), name)
+
+
+def _counted_keys(obj):
+    if obj.canonical_id is not None:
+        return []
+    return stat_keys(obj.status, obj.type, obj.created_at, obj.latitude, obj.longitude)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_alert_stats(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Alert):
+            deltas.update(_counted_keys(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Alert) and session.is_modified(obj, include_collections=False):
+            state = inspect(obj)
+            if _previous(state, 'canonical_id') is None:
+                deltas.subtract(stat_keys(*(_previous(state, name) for name in
+                                            ('status', 'type', 'created_at', 'latitude', 'longitude'))))
+            deltas.update(_counted_keys(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Alert):
+            deltas.subtract(_counted_keys(obj))
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def rebuild(connection):
+    """Recompute the whole rollup from the alerts table (migration / repair)."""
+    deltas = Counter()
+    query = select(Alert.status, Alert.type, Alert.created_at, Alert.latitude, Alert.longitude)
+    # Migration 5 runs this before migration 6 adds canonical_id to older databases
+    if 'canonical_id' in {c['name'] for c in inspect(connection).get_columns('alerts')}:
+        query = query.where(Alert.canonical_id.is_(None))
+    result = connection.execute(query.execution_options(yield_per=5000))
+    for row in result:
+        deltas.update(stat_keys(*row))
+    connection.execute(delete(_stats))
+    apply_deltas(connection, deltas)
+
+
+def alert_stats(days=30):
+    """Counts per dimension; `by_day` covers the last `days` days only."""
+    cutoff = (datetime.utcnow() - timedelta(days=days - 1)).date().isoformat()
+    rows = db.session.execute(
+        select(_stats.c.dimension, _stats.c.key, _stats.c.count)
+        .where(_stats.c.count > 0)
+        .where(or_(_stats.c.dimension != 'day', _stats.c.key >= cutoff))
+    ).all()
+
+    grouped = {dimension: {} for dimension in DIMENSIONS}
+    for dimension, key, count in rows:
+        grouped.setdefault(dimension, {})[key] = count
+
+    regions = [
+        {'region': key, 'bbox': region_bbox(key) if key != 'unknown' else None, 'count': count}
+        for key, count in sorted(grouped['region'].items(), key=lambda item: -item[1])
+    ]
+    by_day = {key: count for key, count in sorted(grouped['day'].items()) if key != 'unknown'}
+    return {
+        'total': sum(grouped['status'].values()),
+        'by_status': grouped['status'],
+        'by_type': grouped['type'],
+        'by_day': by_day,
+        'by_region': regions,
+        'region_degrees': REGION_DEGREES
+    }
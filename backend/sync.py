@@ -0,0 +1,128 @@
+# backend/sync.py
+# Table-level change counter, tombstones and ETag helpers for alert polling.
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import request
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import db, Alert, ChangeCounter, AlertTombstone
+from serialize import alert_select, alert_dicts
+
+ALERTS = 'alerts'
+
+# Peste acest număr de rânduri clientul primește reset=True și reîncarcă tot
+MAX_DELTA_ROWS = 5000
+# updated_at is stamped before commit, so a slow transaction can become visible with
+# a timestamp older than a `since` already handed out; re-send this much history
+DELTA_OVERLAP = timedelta(seconds=5)
+
+_counters = ChangeCounter.__table__
+_tombstones = AlertTombstone.__table__
+
+
+def _initial_version():
+    # Millisecond clock, so a recreated database never reissues an old ETag
+    return int(time.time() * 1000)
+
+
+def ensure_counter(connection, name=ALERTS):
+    exists = connection.execute(select(_counters.c.version).where(_counters.c.name == name)).first()
+    if exists is None:
+        connection.execute(insert(_counters).values(name=name, version=_initial_version()))
+
+
+def bump_version(connection, name=ALERTS):
+    """Increment the change counter inside the caller's transaction."""
+    result = connection.execute(
+        update(_counters).where(_counters.c.name == name).values(version=_counters.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(_counters).values(name=name, version=_initial_version()))
+
+
+def current_version(name=ALERTS):
+    version = db.session.execute(select(_counters.c.version).where(_counters.c.name == name)).scalar()
+    return version or 0
+
+
+def record_tombstones(connection, alert_ids):
+    if alert_ids:
+        now = datetime.utcnow()
+        connection.execute(insert(_tombstones), [{'alert_id': i, 'deleted_at': now} for i in alert_ids])
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_alert_changes(session, flush_context):
+    # new/dirty/deleted still reflect the flushed objects at this point
+    changed = any(isinstance(obj, Alert) for obj in session.new)
+    changed = changed or any(
+        isinstance(obj, Alert) and session.is_modified(obj, include_collections=False)
+        for obj in session.dirty
+    )
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Alert)]
+    if not (changed or deleted):
+        return
+
+    connection = session.connection()
+    record_tombstones(connection, deleted)
+    bump_version(connection)
+
+
+def parse_since(value):
+    """Parse an ISO-8601 timestamp into naive UTC (the format stored in the DB)."""
+    try:
+        since = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError('updated_since must be an ISO-8601 timestamp')
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def alert_delta(since, limit=MAX_DELTA_ROWS):
+    """Alerts changed and ids deleted after `since`.
+
+    Filters (status/type/bbox) are deliberately not applied: a row that left the
+    client's filter must still be reported so the client can drop it. Linked
+    duplicates are left out like in the listings; they are linked from insert
+    on, so a client can never hold one that it would need to drop.
+
+    Rows and deletions from the DELTA_OVERLAP before `since` are sent again:
+    clients upsert by id (keeping the newer updated_at) and ignore repeated deletions.
+    """
+    window = since - DELTA_OVERLAP
+    rows = db.session.execute(
+        alert_select()
+        .where(Alert.updated_at > window, Alert.canonical_id.is_(None))
+        .order_by(Alert.updated_at.asc(), Alert.id.asc())
+        .limit(limit + 1)
+    ).all()
+    deleted = db.session.execute(
+        select(_tombstones.c.alert_id, _tombstones.c.deleted_at).where(_tombstones.c.deleted_at > window)
+    ).all()
+
+    if len(rows) > limit:
+        return {'reset': True, 'alerts': [], 'deleted': [], 'next_since': None}
+
+    stamps = [since] + [a.updated_at for a in rows] + [d.deleted_at for d in deleted]
+    return {
+        'reset': False,
+        'alerts': alert_dicts(rows),
+        'deleted': [d.alert_id for d in deleted],
+        'next_since': max(stamps).isoformat()
+    }
+
+
+def make_etag(version, variant=''):
+    """Strong ETag from the change counter, the full request URL and the
+    representation (variant), for endpoints that negotiate on Accept."""
+    digest = hashlib.sha1((request.full_path + variant).encode('utf-8')).hexdigest()[:12]
+    return f'a{version}-{digest}'
+
+
+def not_modified(etag):
+    # Weak comparison: compressed responses carry the ETag as W/"..."
+    return request.if_none_match.contains_weak(etag)
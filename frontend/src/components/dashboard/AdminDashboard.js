@@ -1,33 +1,68 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { useAuth } from '../context/AuthContext';
+import { mergeFirstPage } from '../../pagination';
 
 const AdminDashboard = () => {
   const { user, logout, getAuthHeaders } = useAuth();
   const [users, setUsers] = useState([]);
   const [alerts, setAlerts] = useState([]);
+  const [usersCursor, setUsersCursor] = useState(null);
+  const [alertsCursor, setAlertsCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [updatingId, setUpdatingId] = useState(null);
+  const [stats, setStats] = useState(null);
+  // True once "Load more" appended alert pages; background refreshes must keep them
+  const alertsPaged = useRef(false);
 
-  const fetchUsers = async () => {
+  // Listings are paginated server-side; pass a cursor to append the next page
+  const fetchUsers = async (cursor = null) => {
     try {
       setError('');
-      const res = await fetch('/api/admin/users', { headers: { 'Content-Type': 'application/json', ...getAuthHeaders() } });
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const res = await fetch(`/api/admin/users${query}`, { headers: { 'Content-Type': 'application/json', ...getAuthHeaders() } });
       const data = await res.json();
       if (!res.ok) throw new Error(data.error || 'Failed to load users');
-      setUsers(data.users || []);
+      setUsers(prev => (cursor ? [...prev, ...(data.users || [])] : (data.users || [])));
+      setUsersCursor(data.next_cursor || null);
     } catch (e) {
       setError(e.message);
     }
   };
 
-  const fetchAlerts = async () => {
+  // merge: refresh only the first page and fold it into the loaded pages (auto-refresh, after edits)
+  const fetchAlerts = async (cursor = null, merge = false) => {
     try {
       setError('');
-      const res = await fetch('/api/admin/alerts', { headers: { 'Content-Type': 'application/json', ...getAuthHeaders() } });
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const res = await fetch(`/api/admin/alerts${query}`, { headers: { 'Content-Type': 'application/json', ...getAuthHeaders() } });
       const data = await res.json();
       if (!res.ok) throw new Error(data.error || 'Failed to load alerts');
-      setAlerts(data.alerts || []);
+      const page = data.alerts || [];
+      if (cursor) {
+        alertsPaged.current = true;
+        setAlerts(prev => [...prev, ...page]);
+      } else if (merge && alertsPaged.current) {
+        // Keep the cursor: it still points after the last loaded page
+        setAlerts(prev => mergeFirstPage(prev, page));
+        return;
+      } else {
+        alertsPaged.current = false;
+        setAlerts(page);
+      }
+      setAlertsCursor(data.next_cursor || null);
+    } catch (e) {
+      setError(e.message);
+    }
+  };
+
+  // Summary counts come from the server-side rollup, not from the loaded pages
+  const fetchStats = async () => {
+    try {
+      const res = await fetch('/api/alerts/stats');
+      const data = await res.json();
+      if (!res.ok) throw new Error(data.error || 'Failed to load stats');
+      setStats(data);
     } catch (e) {
       setError(e.message);
     }
@@ -36,13 +71,14 @@ const AdminDashboard = () => {
   useEffect(() => {
     const load = async () => {
       setLoading(true);
-      await Promise.all([fetchUsers(), fetchAlerts()]);
+      await Promise.all([fetchUsers(), fetchAlerts(), fetchStats()]);
       setLoading(false);
     };
     load();
     // Auto-refresh every 15 seconds
     const id = setInterval(() => {
-      fetchAlerts();
+      fetchAlerts(null, true);
+      fetchStats();
     }, 15000);
     return () => clearInterval(id);
     // eslint-disable-next-line react-hooks/exhaustive-deps
@@ -59,7 +95,7 @@ const AdminDashboard = () => {
       const data = await res.json();
       if (!res.ok) throw new Error(data.error || 'Failed to update alert');
       // refresh list
-      await fetchAlerts();
+      await Promise.all([fetchAlerts(null, true), fetchStats()]);
     } catch (e) {
       setError(e.message);
     } finally {
@@ -79,7 +115,7 @@ const AdminDashboard = () => {
             </div>
             <div className="space-x-2">
               <button 
-                onClick={() => { fetchUsers(); fetchAlerts(); }}
+                onClick={() => { fetchUsers(); fetchAlerts(); fetchStats(); }}
                 className="bg-green-600 text-white px-4 py-2 rounded hover:bg-green-700"
               >
                 Refresh
@@ -97,6 +133,21 @@ const AdminDashboard = () => {
             <div className="mt-4 bg-red-100 border border-red-400 text-red-700 px-4 py-3 rounded">{error}</div>
           )}
 
+          {stats && (
+            <div className="mt-6 grid grid-cols-2 md:grid-cols-4 gap-4">
+              <div className="bg-white rounded-lg shadow p-4">
+                <div className="text-sm text-gray-500">Total alerts</div>
+                <div className="text-2xl font-bold text-gray-900">{stats.total}</div>
+              </div>
+              {['pending', 'investigating', 'resolved'].map(s => (
+                <div key={s} className="bg-white rounded-lg shadow p-4">
+                  <div className="text-sm text-gray-500 capitalize">{s}</div>
+                  <div className="text-2xl font-bold text-gray-900">{stats.by_status[s] || 0}</div>
+                </div>
+              ))}
+            </div>
+          )}
+
           {loading ? (
             <div className="mt-8 text-gray-600">Loading data...</div>
           ) : (
@@ -126,6 +177,11 @@ const AdminDashboard = () => {
                     </tbody>
                   </table>
                 </div>
+                {usersCursor && (
+                  <button onClick={() => fetchUsers(usersCursor)} className="mt-3 px-3 py-1 rounded border text-sm bg-white text-gray-700 hover:bg-gray-50">
+                    Load more
+                  </button>
+                )}
               </div>
 
               {/* Alerts table */}
@@ -170,6 +226,11 @@ const AdminDashboard = () => {
                     </tbody>
                   </table>
                 </div>
+                {alertsCursor && (
+                  <button onClick={() => fetchAlerts(alertsCursor)} className="mt-3 px-3 py-1 rounded border text-sm bg-white text-gray-700 hover:bg-gray-50">
+                    Load more
+                  </button>
+                )}
               </div>
             </div>
           )}
@@ -1,6 +1,10 @@
 // UserAlerts.js
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../../context/AuthContext';
+import { mergeFirstPage } from '../../../pagination';
+
+// fetch() rejects with a TypeError when the server cannot be reached
+const describeError = (error) => (error instanceof TypeError ? 'Failed to connect to server' : error.message);
 
 const UserAlerts = () => {
   const { getAuthHeaders } = useAuth();
@@ -8,41 +12,73 @@ const UserAlerts = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [dismissingId, setDismissingId] = useState(null);
+  // The server returns one page at a time; next_cursor fetches the following one
+  const [cursor, setCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const paged = useRef(false);
 
   useEffect(() => {
     fetchUserAlerts();
+    // Background refresh: first page only, merged so pages loaded with "Load more" stay
     const id = setInterval(() => {
-      fetchUserAlerts();
+      fetchPage(null, true).catch(error => setError(describeError(error)));
     }, 15000);
     return () => clearInterval(id);
   }, []);
 
+  const fetchPage = async (pageCursor = null, merge = false) => {
+    const query = pageCursor ? `?cursor=${encodeURIComponent(pageCursor)}` : '';
+    const response = await fetch(`/api/alerts/user${query}`, {
+      headers: {
+        'Content-Type': 'application/json',
+        ...getAuthHeaders()
+      }
+    });
+
+    const data = await response.json();
+
+    if (!response.ok) {
+      throw new Error(data.error || 'Failed to fetch alerts');
+    }
+    const page = data.alerts || [];
+    if (pageCursor) {
+      paged.current = true;
+      setAlerts(prev => [...prev, ...page]);
+    } else if (merge && paged.current) {
+      // Keep the cursor: it still points after the last loaded page
+      setAlerts(prev => mergeFirstPage(prev, page));
+      return;
+    } else {
+      paged.current = false;
+      setAlerts(page);
+    }
+    setCursor(data.next_cursor || null);
+  };
+
   const fetchUserAlerts = async () => {
     setLoading(true);
     setError('');
     
     try {
-      const response = await fetch('/api/alerts/user', {
-        headers: {
-          'Content-Type': 'application/json',
-          ...getAuthHeaders()
-        }
-      });
-
-      const data = await response.json();
-
-      if (response.ok) {
-        setAlerts(data.alerts);
-      } else {
-        setError(data.error || 'Failed to fetch alerts');
-      }
+      await fetchPage();
     } catch (error) {
-      setError('Failed to connect to server');
+      setError(describeError(error));
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      await fetchPage(cursor);
+    } catch (error) {
+      setError(describeError(error));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const dismissAlert = async (alertId) => {
     setDismissingId(alertId);
     
@@ -181,6 +217,17 @@ const UserAlerts = () => {
               </div>
             </div>
           ))}
+          {cursor && (
+            <div className="text-center">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="px-4 py-2 text-sm border border-gray-300 rounded-md text-gray-700 hover:bg-gray-50 disabled:opacity-50 transition-colors"
+              >
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
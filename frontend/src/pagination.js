@@ -0,0 +1,13 @@
+// Helpers for the cursor-paginated listings (newest first, ordered by created_at then id)
+
+const isOlder = (a, b) => a.created_at < b.created_at || (a.created_at === b.created_at && a.id < b.id);
+
+// Merge a freshly fetched first page into a list that may hold more pages:
+// rows from the page replace their old copies, rows older than the page stay,
+// and rows that fell inside the page's range but are missing from it are dropped.
+export const mergeFirstPage = (loaded, page) => {
+  if (page.length === 0) return [];
+  const ids = new Set(page.map(item => item.id));
+  const last = page[page.length - 1];
+  return [...page, ...loaded.filter(item => !ids.has(item.id) && isOlder(item, last))];
+};
@@ -76,7 +76,7 @@ if not exist node_modules (
 cd ..
 
 echo [3/6] Starting backend (Flask) on port 5000...
-start "Backend" cmd /k "cd /d "%ROOT%backend" && .venv\Scripts\python.exe run.py"
+start "Backend" cmd /k "cd /d "%ROOT%backend" && .venv\Scripts\python.exe run.py --seed"
 
 echo [4/6] Waiting 3 seconds for backend to boot...
 PING -n 4 127.0.0.1 >nul